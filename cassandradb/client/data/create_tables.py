@@ -28,9 +28,19 @@ def create_tables():
         ON items (KEYS(properties))
     """)
 
+    # name lookups use the items_by_name query table instead of an index
+    session.execute("DROP INDEX IF EXISTS idx_items_name")
+
     session.execute("""
-        CREATE INDEX IF NOT EXISTS idx_items_name
-        ON items (name)
+        CREATE TABLE IF NOT EXISTS items_by_name (
+            name TEXT,
+            category TEXT,
+            id UUID,
+            price DECIMAL,
+            producer TEXT,
+            properties MAP<TEXT, TEXT>,
+            PRIMARY KEY (name, category, id)
+        )
     """)
 
     session.execute("DROP TABLE IF EXISTS orders")
@@ -52,7 +62,7 @@ def create_tables():
         ON orders (item_ids)
     """)
 
-    print("Tables 'items' and 'orders' created successfully")
+    print("Tables 'items', 'items_by_name' and 'orders' created successfully")
 
     cluster.shutdown()
 
@@ -1,15 +1,17 @@
 import uuid
 from datetime import datetime
+from decimal import Decimal
 
-from cassandra.cluster import Cluster
+from client.prepared_statements import get_statements
+from client.session import get_session
 
 
 def seed_data():
-    cluster = Cluster(["localhost"], port=9042)
-    session = cluster.connect("test_keyspace")
-    session.default_timeout = 60
+    session = get_session()
+    statements = get_statements(session)
 
     session.execute("TRUNCATE items")
+    session.execute("TRUNCATE items_by_name")
     session.execute("TRUNCATE orders")
 
     items = [
@@ -75,13 +77,20 @@ def seed_data():
     for name, category, price, producer, properties in items:
         item_id = uuid.uuid4()
         item_ids.append(item_id)
-        session.execute(
-            """
-            INSERT INTO items (id, name, category, price, producer, properties)
-            VALUES (%s, %s, %s, %s, %s, %s)
-            """,
-            (item_id, name, category, price, producer, properties),
-        )
+        price = Decimal(str(price))
+        # keep items and its name lookup table in sync
+        statements.execute_batch([
+            (
+                "INSERT INTO items (id, name, category, price, producer, properties) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (item_id, name, category, price, producer, properties),
+            ),
+            (
+                "INSERT INTO items_by_name (name, category, id, price, producer, properties) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (name, category, item_id, price, producer, properties),
+            ),
+        ])
 
     print(f"Inserted {len(items)} items")
 
@@ -94,18 +103,21 @@ def seed_data():
     ]
 
     for customer, items_set, total, status in orders:
-        session.execute(
-            """
-            INSERT INTO orders (id, customer_name, order_date, item_ids, total_price, status)
-            VALUES (%s, %s, %s, %s, %s, %s)
-            """,
-            (uuid.uuid4(), customer, datetime.now(), items_set, total, status),
+        statements.execute(
+            "INSERT INTO orders (id, customer_name, order_date, item_ids, total_price, status) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                uuid.uuid4(),
+                customer,
+                datetime.now(),
+                items_set,
+                Decimal(str(total)),
+                status,
+            ),
         )
 
     print(f"Inserted {len(orders)} orders")
 
-    cluster.shutdown()
-
 
 if __name__ == "__main__":
     seed_data()
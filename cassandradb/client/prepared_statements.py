@@ -0,0 +1,71 @@
+"""Blocking prepared statement cache for the cassandradb scripts.
+
+web_counter/utils/prepared_statements.py is the asyncio counterpart used by
+CassandraStorage, the projects run separately so each keeps its own module.
+"""
+
+import threading
+import weakref
+
+from cassandra.query import BatchStatement, BatchType
+
+
+class PreparedStatementRegistry:
+    """Prepared statements of one session, keyed by CQL text and consistency level.
+
+    A node that lost a statement (e.g. after a restart) answers UNPREPARED, the
+    driver prepares it again and retries on its own.
+    """
+
+    def __init__(self, session):
+        self._session = session
+        self._statements = {}
+        self._lock = threading.Lock()
+
+    def prepare(self, query, consistency_level=None):
+        key = (query, consistency_level)
+        statement = self._statements.get(key)
+        if statement is None:
+            with self._lock:
+                statement = self._statements.get(key)
+                if statement is None:
+                    statement = self._session.prepare(query)
+                    if consistency_level is not None:
+                        statement.consistency_level = consistency_level
+                    self._statements[key] = statement
+        return statement
+
+    def execute(self, query, parameters=(), consistency_level=None):
+        statement = self.prepare(query, consistency_level)
+        return self._session.execute(statement.bind(parameters))
+
+    def execute_batch(self, queries, consistency_level=None):
+        """Run (query, parameters) pairs atomically as one logged batch."""
+        return self._session.execute(self._batch(queries, consistency_level))
+
+    def _batch(self, queries, consistency_level):
+        batch = BatchStatement(batch_type=BatchType.LOGGED)
+        if consistency_level is not None:
+            batch.consistency_level = consistency_level
+        for query, parameters in queries:
+            batch.add(self.prepare(query), parameters)
+        return batch
+
+    def execute_async(self, query, parameters=(), consistency_level=None):
+        """Bind and send without waiting, returns the driver's ResponseFuture."""
+        statement = self.prepare(query, consistency_level)
+        return self._session.execute_async(statement.bind(parameters))
+
+
+_registries = weakref.WeakKeyDictionary()
+_registries_lock = threading.Lock()
+
+
+def get_statements(session):
+    """Return the prepared statement registry of a session."""
+    with _registries_lock:
+        registry = _registries.get(session)
+        if registry is None:
+            registry = PreparedStatementRegistry(session)
+            _registries[session] = registry
+        return registry
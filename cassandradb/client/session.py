@@ -0,0 +1,88 @@
+import atexit
+import logging
+import os
+import threading
+
+from cassandra.cluster import EXEC_PROFILE_DEFAULT, Cluster, ExecutionProfile
+from cassandra.policies import DCAwareRoundRobinPolicy, HostDistance, TokenAwarePolicy
+
+
+logger = logging.getLogger(__name__)
+
+KEYSPACE = "test_keyspace"
+
+_lock = threading.Lock()
+_cluster = None
+_sessions = {}
+
+
+def _create_cluster():
+    """Build the cluster with token-aware, DC-aware routing.
+
+    Settings come from the environment:
+    CASSANDRA_HOSTS (comma separated), CASSANDRA_PORT, CASSANDRA_LOCAL_DC,
+    CASSANDRA_REQUEST_TIMEOUT and CASSANDRA_CONNECTIONS_PER_HOST.
+    """
+    profile = ExecutionProfile(
+        # route each request straight to a replica in the local datacenter
+        load_balancing_policy=TokenAwarePolicy(
+            DCAwareRoundRobinPolicy(
+                local_dc=os.getenv("CASSANDRA_LOCAL_DC", "datacenter1")
+            )
+        ),
+        request_timeout=float(os.getenv("CASSANDRA_REQUEST_TIMEOUT", 60)),
+    )
+    cluster = Cluster(
+        os.getenv("CASSANDRA_HOSTS", "localhost").split(","),
+        port=int(os.getenv("CASSANDRA_PORT", 9042)),
+        execution_profiles={EXEC_PROFILE_DEFAULT: profile},
+    )
+
+    connections_per_host = os.getenv("CASSANDRA_CONNECTIONS_PER_HOST")
+    if connections_per_host:
+        _set_connections_per_host(cluster, int(connections_per_host))
+
+    return cluster
+
+
+def _set_connections_per_host(cluster, connections):
+    # protocol v3+ multiplexes requests over one connection per host, the pool
+    # size can only be changed for v1/v2
+    if cluster.protocol_version is not None and cluster.protocol_version >= 3:
+        logger.warning(
+            "Connections per host is fixed to 1 for protocol v3+, ignoring %s",
+            connections,
+        )
+        return
+    cluster.set_core_connections_per_host(HostDistance.LOCAL, connections)
+    cluster.set_max_connections_per_host(HostDistance.LOCAL, connections)
+
+
+def get_session(keyspace=KEYSPACE):
+    """Return the process-wide session for a keyspace, connecting on first use."""
+    global _cluster
+
+    session = _sessions.get(keyspace)
+    if session is not None:
+        return session
+
+    with _lock:
+        if _cluster is None:
+            _cluster = _create_cluster()
+        if keyspace not in _sessions:
+            _sessions[keyspace] = _cluster.connect(keyspace)
+        return _sessions[keyspace]
+
+
+def shutdown():
+    """Close all sessions and the cluster connection."""
+    global _cluster
+
+    with _lock:
+        if _cluster is not None:
+            _cluster.shutdown()
+        _cluster = None
+        _sessions.clear()
+
+
+atexit.register(shutdown)
@@ -1,86 +1,89 @@
-from cassandra.cluster import Cluster
+from client.prepared_statements import get_statements
+from client.session import get_session
 
 
-def update_item_property(category, price, producer, item_id, key, new_value):
+def update_item_property(category, price, producer, item_id, name, key, new_value):
     """Update a specific property value for an item."""
-    cluster = Cluster(["localhost"], port=9042)
-    session = cluster.connect("test_keyspace")
-    session.default_timeout = 60
-
-    session.execute(
-        "UPDATE items SET properties[%s] = %s WHERE category = %s AND price = %s AND producer = %s AND id = %s",
-        (key, new_value, category, price, producer, item_id),
-    )
+    statements = get_statements(get_session())
+
+    statements.execute_batch([
+        (
+            "UPDATE items SET properties[?] = ? WHERE category = ? AND price = ? AND producer = ? AND id = ?",
+            (key, new_value, category, price, producer, item_id),
+        ),
+        (
+            "UPDATE items_by_name SET properties[?] = ? WHERE name = ? AND category = ? AND id = ?",
+            (key, new_value, name, category, item_id),
+        ),
+    ])
 
     print(f"Updated property '{key}' to '{new_value}'")
 
-    row = session.execute(
-        "SELECT * FROM items WHERE category = %s AND price = %s AND producer = %s AND id = %s",
+    row = statements.execute(
+        "SELECT * FROM items WHERE category = ? AND price = ? AND producer = ? AND id = ?",
         (category, price, producer, item_id),
     ).one()
 
     print(f"  {row.name} | {row.properties}")
 
-    cluster.shutdown()
-
 
-def add_item_properties(category, price, producer, item_id, new_properties):
+def add_item_properties(category, price, producer, item_id, name, new_properties):
     """Add new properties to an item's properties map."""
-    cluster = Cluster(["localhost"], port=9042)
-    session = cluster.connect("test_keyspace")
-    session.default_timeout = 60
-
-    session.execute(
-        "UPDATE items SET properties = properties + %s WHERE category = %s AND price = %s AND producer = %s AND id = %s",
-        (new_properties, category, price, producer, item_id),
-    )
+    statements = get_statements(get_session())
+
+    statements.execute_batch([
+        (
+            "UPDATE items SET properties = properties + ? WHERE category = ? AND price = ? AND producer = ? AND id = ?",
+            (new_properties, category, price, producer, item_id),
+        ),
+        (
+            "UPDATE items_by_name SET properties = properties + ? WHERE name = ? AND category = ? AND id = ?",
+            (new_properties, name, category, item_id),
+        ),
+    ])
 
     print(f"Added properties: {new_properties}")
 
-    row = session.execute(
-        "SELECT * FROM items WHERE category = %s AND price = %s AND producer = %s AND id = %s",
+    row = statements.execute(
+        "SELECT * FROM items WHERE category = ? AND price = ? AND producer = ? AND id = ?",
         (category, price, producer, item_id),
     ).one()
 
     print(f"  {row.name} | {row.properties}")
 
-    cluster.shutdown()
 
-
-def delete_item_property(category, price, producer, item_id, key):
+def delete_item_property(category, price, producer, item_id, name, key):
     """Delete a specific property from an item's properties map."""
-    cluster = Cluster(["localhost"], port=9042)
-    session = cluster.connect("test_keyspace")
-    session.default_timeout = 60
-
-    session.execute(
-        "DELETE properties[%s] FROM items WHERE category = %s AND price = %s AND producer = %s AND id = %s",
-        (key, category, price, producer, item_id),
-    )
+    statements = get_statements(get_session())
+
+    statements.execute_batch([
+        (
+            "DELETE properties[?] FROM items WHERE category = ? AND price = ? AND producer = ? AND id = ?",
+            (key, category, price, producer, item_id),
+        ),
+        (
+            "DELETE properties[?] FROM items_by_name WHERE name = ? AND category = ? AND id = ?",
+            (key, name, category, item_id),
+        ),
+    ])
 
     print(f"Deleted property '{key}'")
 
-    row = session.execute(
-        "SELECT * FROM items WHERE category = %s AND price = %s AND producer = %s AND id = %s",
+    row = statements.execute(
+        "SELECT * FROM items WHERE category = ? AND price = ? AND producer = ? AND id = ?",
         (category, price, producer, item_id),
     ).one()
 
     print(f"  {row.name} | {row.properties}")
 
-    cluster.shutdown()
-
 
 if __name__ == "__main__":
-    cluster = Cluster(["localhost"], port=9042)
-    session = cluster.connect("test_keyspace")
-    session.default_timeout = 60
+    session = get_session()
 
     row = session.execute(
         "SELECT * FROM items WHERE category = 'electronics' LIMIT 1"
     ).one()
 
-    cluster.shutdown()
-
     if row:
         print(f"Before: {row.name} | {row.properties}")
         # update existing property
@@ -89,6 +92,7 @@ if __name__ == "__main__":
             row.price,
             row.producer,
             row.id,
+            row.name,
             "color",
             "midnight-black",
         )
@@ -99,6 +103,7 @@ if __name__ == "__main__":
             row.price,
             row.producer,
             row.id,
+            row.name,
             {"warranty": "2 years", "weight": "350g"},
         )
         print()
@@ -108,5 +113,6 @@ if __name__ == "__main__":
             row.price,
             row.producer,
             row.id,
+            row.name,
             "weight",
         )
@@ -1,134 +1,136 @@
 import uuid
 from datetime import datetime
 
-from cassandra.cluster import Cluster
+from cassandra.concurrent import execute_concurrent_with_args
+from client.prepared_statements import get_statements
+from client.session import get_session
+
+
+# max item lookups in flight at once
+ITEM_LOOKUP_CONCURRENCY = 32
+
+
+def find_items_by_name(statements, item_names):
+    """Look up (id, price) for every item name concurrently.
+
+    Lookups are sent at most ITEM_LOOKUP_CONCURRENCY at a time, so a large order
+    takes about one round trip instead of one per item. Missing items and failed
+    lookups are reported and skipped. Returns rows in the order of item_names.
+    """
+    statement = statements.prepare("SELECT id, price FROM items_by_name WHERE name = ?")
+    results = execute_concurrent_with_args(
+        get_session(),
+        statement,
+        [(name,) for name in item_names],
+        concurrency=ITEM_LOOKUP_CONCURRENCY,
+        raise_on_first_error=False,
+    )
+
+    item_rows = []
+    for name, (success, result) in zip(item_names, results):
+        if not success:
+            print(f"Lookup of item '{name}' failed: {result}, skipping")
+            continue
+        item_row = result.one()
+        if not item_row:
+            print(f"Item '{name}' not found, skipping")
+            continue
+        item_rows.append(item_row)
+    return item_rows
 
 
 def add_items_to_order(customer_name, order_date, order_id, item_names):
     """Add items to an order and update total price."""
-    cluster = Cluster(["localhost"], port=9042)
-    session = cluster.connect("test_keyspace")
-    session.default_timeout = 60
+    statements = get_statements(get_session())
 
     new_ids = set()
     added_price = 0
-    for name in item_names:
-        item_row = session.execute(
-            "SELECT id, price FROM items WHERE name = %s", (name,)
-        ).one()
-        if not item_row:
-            print(f"Item '{name}' not found, skipping")
-            continue
+    for item_row in find_items_by_name(statements, item_names):
         new_ids.add(item_row.id)
-        added_price += float(item_row.price)
+        added_price += item_row.price
 
-    current = session.execute(
-        "SELECT total_price FROM orders WHERE customer_name = %s AND order_date = %s AND id = %s",
+    current = statements.execute(
+        "SELECT total_price FROM orders WHERE customer_name = ? AND order_date = ? AND id = ?",
         (customer_name, order_date, order_id),
     ).one()
-    new_price = float(current.total_price) + added_price
+    new_price = current.total_price + added_price
 
-    session.execute(
-        "UPDATE orders SET item_ids = item_ids + %s, total_price = %s "
-        "WHERE customer_name = %s AND order_date = %s AND id = %s",
+    statements.execute(
+        "UPDATE orders SET item_ids = item_ids + ?, total_price = ? "
+        "WHERE customer_name = ? AND order_date = ? AND id = ?",
         (new_ids, new_price, customer_name, order_date, order_id),
     )
 
     print(
         f"Added {len(new_ids)} items to order {order_id}, price increased by {added_price}"
     )
-    cluster.shutdown()
 
 
 def remove_items_from_order(customer_name, order_date, order_id, item_names):
     """Remove items from an order and update total price."""
-    cluster = Cluster(["localhost"], port=9042)
-    session = cluster.connect("test_keyspace")
-    session.default_timeout = 60
+    statements = get_statements(get_session())
 
     remove_ids = set()
     removed_price = 0
-    for name in item_names:
-        item_row = session.execute(
-            "SELECT id, price FROM items WHERE name = %s", (name,)
-        ).one()
-        if not item_row:
-            print(f"Item '{name}' not found, skipping")
-            continue
+    for item_row in find_items_by_name(statements, item_names):
         remove_ids.add(item_row.id)
-        removed_price += float(item_row.price)
+        removed_price += item_row.price
 
-    current = session.execute(
-        "SELECT total_price FROM orders WHERE customer_name = %s AND order_date = %s AND id = %s",
+    current = statements.execute(
+        "SELECT total_price FROM orders WHERE customer_name = ? AND order_date = ? AND id = ?",
         (customer_name, order_date, order_id),
     ).one()
-    new_price = float(current.total_price) - removed_price
+    new_price = current.total_price - removed_price
 
-    session.execute(
-        "UPDATE orders SET item_ids = item_ids - %s, total_price = %s "
-        "WHERE customer_name = %s AND order_date = %s AND id = %s",
+    statements.execute(
+        "UPDATE orders SET item_ids = item_ids - ?, total_price = ? "
+        "WHERE customer_name = ? AND order_date = ? AND id = ?",
         (remove_ids, new_price, customer_name, order_date, order_id),
     )
 
     print(
         f"Removed {len(remove_ids)} items from order {order_id}, price decreased by {removed_price}"
     )
-    cluster.shutdown()
 
 
 def print_order(customer_name):
     """Print all orders for a customer."""
-    cluster = Cluster(["localhost"], port=9042)
-    session = cluster.connect("test_keyspace")
-    session.default_timeout = 60
+    statements = get_statements(get_session())
 
-    rows = session.execute(
-        "SELECT * FROM orders WHERE customer_name = %s", (customer_name,)
+    rows = statements.execute(
+        "SELECT * FROM orders WHERE customer_name = ?", (customer_name,)
     )
     for row in rows:
         print(
             f"  {row.customer_name} | {row.order_date} | {row.item_ids} | {row.total_price}"
         )
 
-    cluster.shutdown()
-
 
 def get_first_order(customer_name):
     """Get the first order for a customer (most recent by date)."""
-    cluster = Cluster(["localhost"], port=9042)
-    session = cluster.connect("test_keyspace")
-    session.default_timeout = 60
+    statements = get_statements(get_session())
 
-    row = session.execute(
-        "SELECT * FROM orders WHERE customer_name = %s LIMIT 1", (customer_name,)
+    row = statements.execute(
+        "SELECT * FROM orders WHERE customer_name = ? LIMIT 1", (customer_name,)
     ).one()
 
-    cluster.shutdown()
     return row
 
 
 def create_order_with_ttl(customer_name, item_names, ttl_seconds):
     """Create an order with a TTL — it will be automatically deleted after ttl_seconds."""
-    cluster = Cluster(["localhost"], port=9042)
-    session = cluster.connect("test_keyspace")
-    session.default_timeout = 60
+    statements = get_statements(get_session())
 
     item_ids = set()
     total_price = 0
-    for name in item_names:
-        item_row = session.execute(
-            "SELECT id, price FROM items WHERE name = %s", (name,)
-        ).one()
-        if not item_row:
-            print(f"Item '{name}' not found, skipping")
-            continue
+    for item_row in find_items_by_name(statements, item_names):
         item_ids.add(item_row.id)
-        total_price += float(item_row.price)
+        total_price += item_row.price
 
     order_id = uuid.uuid4()
-    session.execute(
+    statements.execute(
         "INSERT INTO orders (id, customer_name, order_date, item_ids, total_price, status) "
-        "VALUES (%s, %s, %s, %s, %s, %s) USING TTL %s",
+        "VALUES (?, ?, ?, ?, ?, ?) USING TTL ?",
         (
             order_id,
             customer_name,
@@ -143,7 +145,6 @@ def create_order_with_ttl(customer_name, item_names, ttl_seconds):
     print(
         f"Created order {order_id} for '{customer_name}' with TTL={ttl_seconds}s (total: {total_price})"
     )
-    cluster.shutdown()
 
 
 if __name__ == "__main__":
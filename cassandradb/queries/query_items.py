@@ -1,10 +1,11 @@
-from cassandra.cluster import Cluster
+from decimal import Decimal
+
+from client.prepared_statements import get_statements
+from client.session import get_session
 
 
 def describe_tables():
-    cluster = Cluster(["localhost"], port=9042)
-    session = cluster.connect("test_keyspace")
-    session.default_timeout = 60
+    session = get_session()
 
     result = session.execute("DESCRIBE TABLE items")
     print("=== ITEMS TABLE ===")
@@ -13,17 +14,13 @@ def describe_tables():
 
     print()
 
-    cluster.shutdown()
-
 
 def items_by_category_sorted_by_price(category):
     """All items in a category, sorted by price (ASC by clustering order)."""
-    cluster = Cluster(["localhost"], port=9042)
-    session = cluster.connect("test_keyspace")
-    session.default_timeout = 60
+    statements = get_statements(get_session())
 
-    rows = session.execute(
-        "SELECT * FROM items WHERE category = %s ORDER BY price ASC",
+    rows = statements.execute(
+        "SELECT * FROM items WHERE category = ? ORDER BY price ASC",
         (category,),
     )
 
@@ -31,69 +28,53 @@ def items_by_category_sorted_by_price(category):
     for row in rows:
         print(f"  {row.name} | {row.price} | {row.producer} | {row.properties}")
 
-    cluster.shutdown()
-
 
 def items_by_category_and_name(category, name):
     """Items in a category filtered by name."""
-    cluster = Cluster(["localhost"], port=9042)
-    session = cluster.connect("test_keyspace")
-    session.default_timeout = 60
+    statements = get_statements(get_session())
 
-    rows = session.execute(
-        "SELECT * FROM items WHERE category = %s AND name = %s",
-        (category, name),
+    rows = statements.execute(
+        "SELECT * FROM items_by_name WHERE name = ? AND category = ?",
+        (name, category),
     )
 
     print(f"=== Items in '{category}' with name '{name}' ===")
     for row in rows:
         print(f"  {row.name} | {row.price} | {row.producer} | {row.properties}")
 
-    cluster.shutdown()
-
 
 def items_by_category_and_price_range(category, min_price, max_price):
     """Items in a category within a price range."""
-    cluster = Cluster(["localhost"], port=9042)
-    session = cluster.connect("test_keyspace")
-    session.default_timeout = 60
+    statements = get_statements(get_session())
 
-    rows = session.execute(
-        "SELECT * FROM items WHERE category = %s AND price >= %s AND price <= %s",
-        (category, min_price, max_price),
+    rows = statements.execute(
+        "SELECT * FROM items WHERE category = ? AND price >= ? AND price <= ?",
+        (category, Decimal(str(min_price)), Decimal(str(max_price))),
     )
 
     print(f"=== Items in '{category}' with price {min_price}-{max_price} ===")
     for row in rows:
         print(f"  {row.name} | {row.price} | {row.producer} | {row.properties}")
 
-    cluster.shutdown()
-
 
 def items_by_category_price_and_producer(category, price, producer):
-    cluster = Cluster(["localhost"], port=9042)
-    session = cluster.connect("test_keyspace")
-    session.default_timeout = 60
+    statements = get_statements(get_session())
 
-    rows = session.execute(
-        "SELECT * FROM items WHERE category = %s AND price = %s AND producer = %s",
-        (category, price, producer),
+    rows = statements.execute(
+        "SELECT * FROM items WHERE category = ? AND price = ? AND producer = ?",
+        (category, Decimal(str(price)), producer),
     )
 
     for row in rows:
         print(f"  {row.name} | {row.price} | {row.producer} | {row.properties}")
 
-    cluster.shutdown()
-
 
 def items_by_property_key(key):
     """Items that have a certain property key (e.g. 'color')."""
-    cluster = Cluster(["localhost"], port=9042)
-    session = cluster.connect("test_keyspace")
-    session.default_timeout = 60
+    statements = get_statements(get_session())
 
-    rows = session.execute(
-        "SELECT * FROM items WHERE properties CONTAINS KEY %s",
+    rows = statements.execute(
+        "SELECT * FROM items WHERE properties CONTAINS KEY ?",
         (key,),
     )
 
@@ -101,17 +82,13 @@ def items_by_property_key(key):
     for row in rows:
         print(f"  {row.name} | {row.category} | {row.properties}")
 
-    cluster.shutdown()
-
 
 def items_by_property_key_and_value(key, value):
     """Items with a specific property key-value pair."""
-    cluster = Cluster(["localhost"], port=9042)
-    session = cluster.connect("test_keyspace")
-    session.default_timeout = 60
+    statements = get_statements(get_session())
 
-    rows = session.execute(
-        "SELECT * FROM items WHERE properties[%s] = %s",
+    rows = statements.execute(
+        "SELECT * FROM items WHERE properties[?] = ?",
         (key, value),
     )
 
@@ -119,8 +96,6 @@ def items_by_property_key_and_value(key, value):
     for row in rows:
         print(f"  {row.name} | {row.category} | {row.properties}")
 
-    cluster.shutdown()
-
 
 if __name__ == "__main__":
     # 1 - describe tables
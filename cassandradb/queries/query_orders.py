@@ -1,29 +1,24 @@
 from datetime import datetime
 
-from cassandra.cluster import Cluster
+from client.prepared_statements import get_statements
+from client.session import get_session
 
 
 def describe_orders():
-    cluster = Cluster(["localhost"], port=9042)
-    session = cluster.connect("test_keyspace")
-    session.default_timeout = 60
+    session = get_session()
 
     result = session.execute("DESCRIBE TABLE orders")
     print("=== ORDERS TABLE ===")
     for row in result:
         print(row.create_statement)
 
-    cluster.shutdown()
-
 
 def orders_by_customer_sorted_by_date(customer_name):
     """All orders for a customer, sorted by order date (DESC by clustering order)."""
-    cluster = Cluster(["localhost"], port=9042)
-    session = cluster.connect("test_keyspace")
-    session.default_timeout = 60
+    statements = get_statements(get_session())
 
-    rows = session.execute(
-        "SELECT * FROM orders WHERE customer_name = %s ORDER BY order_date DESC",
+    rows = statements.execute(
+        "SELECT * FROM orders WHERE customer_name = ? ORDER BY order_date DESC",
         (customer_name,),
     )
 
@@ -33,29 +28,24 @@ def orders_by_customer_sorted_by_date(customer_name):
             f"  {row.id} | {row.order_date} | {row.item_ids} | {row.total_price} | {row.status}"
         )
 
-    cluster.shutdown()
-
 
 def orders_by_customer_with_item(customer_name, item_name):
     """Find orders for a customer that contain a specific item (looked up by name)."""
-    cluster = Cluster(["localhost"], port=9042)
-    session = cluster.connect("test_keyspace")
-    session.default_timeout = 60
+    statements = get_statements(get_session())
 
-    item_rows = session.execute(
-        "SELECT id FROM items WHERE name = %s",
+    item_rows = statements.execute(
+        "SELECT id FROM items_by_name WHERE name = ?",
         (item_name,),
     )
     item_row = item_rows.one()
     if not item_row:
         print(f"Item '{item_name}' not found")
-        cluster.shutdown()
         return
 
     item_id = item_row.id
 
-    rows = session.execute(
-        "SELECT * FROM orders WHERE customer_name = %s AND item_ids CONTAINS %s",
+    rows = statements.execute(
+        "SELECT * FROM orders WHERE customer_name = ? AND item_ids CONTAINS ?",
         (customer_name, item_id),
     )
 
@@ -65,17 +55,13 @@ def orders_by_customer_with_item(customer_name, item_name):
             f"  {row.id} | {row.order_date} | {row.item_ids} | {row.total_price} | {row.status}"
         )
 
-    cluster.shutdown()
-
 
 def orders_by_customer_in_period(customer_name, start_date, end_date):
     """Find orders for a customer within a time period and their count."""
-    cluster = Cluster(["localhost"], port=9042)
-    session = cluster.connect("test_keyspace")
-    session.default_timeout = 60
+    statements = get_statements(get_session())
 
-    count_rows = session.execute(
-        "SELECT COUNT(*) as cnt FROM orders WHERE customer_name = %s AND order_date >= %s AND order_date <= %s",
+    count_rows = statements.execute(
+        "SELECT COUNT(*) as cnt FROM orders WHERE customer_name = ? AND order_date >= ? AND order_date <= ?",
         (customer_name, start_date, end_date),
     )
 
@@ -83,16 +69,12 @@ def orders_by_customer_in_period(customer_name, start_date, end_date):
         f"  Total count for {customer_name} from {start_date} to {end_date}: {count_rows.one().cnt} "
     )
 
-    cluster.shutdown()
-
 
 def max_price_order_per_customer():
     """For each customer, find the order with the maximum total price."""
-    cluster = Cluster(["localhost"], port=9042)
-    session = cluster.connect("test_keyspace")
-    session.default_timeout = 60
+    statements = get_statements(get_session())
 
-    rows = session.execute(
+    rows = statements.execute(
         "SELECT customer_name, MAX(total_price) as max_price FROM orders GROUP BY customer_name"
     )
 
@@ -100,16 +82,12 @@ def max_price_order_per_customer():
     for row in rows:
         print(f"  {row.customer_name} | max total_price: {row.max_price}")
 
-    cluster.shutdown()
-
 
 def writetime_of_total_price():
     """For each order, show when total_price was written to the database."""
-    cluster = Cluster(["localhost"], port=9042)
-    session = cluster.connect("test_keyspace")
-    session.default_timeout = 60
+    statements = get_statements(get_session())
 
-    rows = session.execute(
+    rows = statements.execute(
         "SELECT customer_name, id, total_price, WRITETIME(total_price) as wt FROM orders"
     )
 
@@ -120,16 +98,12 @@ def writetime_of_total_price():
             f"  {row.customer_name} | {row.id} | {row.total_price} | writetime: {wt:%Y-%m-%d %H:%M:%S}"
         )
 
-    cluster.shutdown()
-
 
 def total_sum_per_customer():
     """For each customer, find the total sum of all their orders."""
-    cluster = Cluster(["localhost"], port=9042)
-    session = cluster.connect("test_keyspace")
-    session.default_timeout = 60
+    statements = get_statements(get_session())
 
-    rows = session.execute(
+    rows = statements.execute(
         "SELECT customer_name, SUM(total_price) as total_sum FROM orders GROUP BY customer_name"
     )
 
@@ -137,8 +111,6 @@ def total_sum_per_customer():
     for row in rows:
         print(f"  {row.customer_name} | total sum: {row.total_sum}")
 
-    cluster.shutdown()
-
 
 if __name__ == "__main__":
     # 1 - describe orders table
@@ -1,9 +1,11 @@
+from collections import Counter, deque
 import logging
 from multiprocessing import Process
 import time
 
 from hazelcast import HazelcastClient
 from hazelcast.config import Config
+from workload import KeyChooser, KeyDistribution, make_key_chooser
 
 
 logging.basicConfig(
@@ -16,49 +18,141 @@ logger = logging.getLogger(__name__)
 MAP_NAME = "my-distributed-map"
 CLUSTER_NAME = "hello-world"
 COUNTER_KEY = "counter"
+SINGLE_KEY = KeyChooser()
+# outstanding increment_and_get calls per process in pipelined mode
+PIPELINE_WINDOW = 64
+# increments pre-aggregated locally per add_and_get round in batched mode
+BATCH_SIZE = 100
 
 
-def increment_counter_atomic_long(process_id, iterations):
+def counter_key(key: int) -> str:
+    return f"{COUNTER_KEY}:{key}"
+
+
+def make_client():
     config = Config()
     config.cluster_name = CLUSTER_NAME
     config.connection_timeout = 10.0
-    client = HazelcastClient(config=config)
+    return HazelcastClient(config=config)
+
+
+class AtomicLongs:
+    """One proxy per key, created on first use"""
+
+    def __init__(self, client):
+        self.client = client
+        self._proxies = {}
+
+    def get(self, key: int):
+        if key not in self._proxies:
+            self._proxies[key] = self.client.cp_subsystem.get_atomic_long(
+                counter_key(key)
+            )
+        return self._proxies[key]
+
+
+def increment_counter_atomic_long(
+    process_id, iterations, key_chooser: KeyChooser = SINGLE_KEY
+):
+    client = make_client()
     logger.info(f"Process {process_id} started")
-    atomic_long = client.cp_subsystem.get_atomic_long(COUNTER_KEY)
+    atomic_longs = AtomicLongs(client)
     for i in range(iterations):
         if i % 1000 == 0:
             logger.info(f"Process {process_id} - Iteration {i}")
-        atomic_long.increment_and_get().result()
+        atomic_longs.get(key_chooser.next()).increment_and_get().result()
 
     logger.info(f"Process {process_id} finished")
     client.shutdown()
 
 
-if __name__ == "__main__":
-    # Configuration
-    num_processes = 10
-    iterations_per_process = 10_000
-    expected_total = num_processes * iterations_per_process
+def increment_counter_atomic_long_pipelined(
+    process_id,
+    iterations,
+    key_chooser: KeyChooser = SINGLE_KEY,
+    window: int = PIPELINE_WINDOW,
+):
+    """Keeps up to `window` increments in flight instead of waiting for each one"""
+    client = make_client()
+    logger.info(f"Process {process_id} started, window: {window}")
+    atomic_longs = AtomicLongs(client)
+    in_flight = deque()
+    for i in range(iterations):
+        if i % 1000 == 0:
+            logger.info(f"Process {process_id} - Iteration {i}")
+        if len(in_flight) >= window:
+            # raises if the increment failed
+            in_flight.popleft().result()
+        in_flight.append(atomic_longs.get(key_chooser.next()).increment_and_get())
 
-    client = HazelcastClient(
-        cluster_name=CLUSTER_NAME,
-    )
-    atomic_long = client.cp_subsystem.get_atomic_long(COUNTER_KEY)
-    atomic_long.set(0).result()
+    while in_flight:
+        in_flight.popleft().result()
+
+    logger.info(f"Process {process_id} finished")
+    client.shutdown()
+
+
+def increment_counter_atomic_long_batched(
+    process_id,
+    iterations,
+    key_chooser: KeyChooser = SINGLE_KEY,
+    batch_size: int = BATCH_SIZE,
+):
+    """Sums `batch_size` increments per key locally, then one add_and_get per key"""
+    client = make_client()
+    logger.info(f"Process {process_id} started, batch size: {batch_size}")
+    atomic_longs = AtomicLongs(client)
+    for batch_start in range(0, iterations, batch_size):
+        size = min(batch_size, iterations - batch_start)
+        increments = Counter(key_chooser.next() for _ in range(size))
+        futures = [
+            atomic_longs.get(key).add_and_get(delta)
+            for key, delta in increments.items()
+        ]
+        for future in futures:
+            future.result()
+
+    logger.info(f"Process {process_id} finished")
+    client.shutdown()
+
+
+STRATEGIES = {
+    "atomic_long": increment_counter_atomic_long,
+    "pipelined": increment_counter_atomic_long_pipelined,
+    "batched": increment_counter_atomic_long_batched,
+}
+
+
+def run_strategy(
+    name: str, num_processes: int, iterations_per_process: int, key_chooser
+) -> dict:
+    expected_total = num_processes * iterations_per_process
+    keys = [
+        counter_key(key)
+        for key in range(key_chooser.first_key, key_chooser.last_key + 1)
+    ]
+
+    client = make_client()
+    for key in keys:
+        client.cp_subsystem.get_atomic_long(key).set(0).result()
     client.shutdown()
 
     logger.info(
-        f"Starting {num_processes} processes, each doing {iterations_per_process} increments"
+        f"{name}: starting {num_processes} processes, "
+        f"each doing {iterations_per_process} increments"
     )
+    logger.info(f"Keys: {key_chooser.describe()}")
     logger.info(f"Expected final value: {expected_total}")
 
     # Create and start processes
     processes = []
     start_time = time.time()
 
-    target_func = increment_counter_atomic_long
     for process_id in range(num_processes):
-        p = Process(target=target_func, args=(process_id, iterations_per_process))
+        p = Process(
+            target=STRATEGIES[name],
+            args=(process_id, iterations_per_process, key_chooser),
+        )
         processes.append(p)
         p.start()
 
@@ -66,20 +160,46 @@ if __name__ == "__main__":
     for p in processes:
         p.join()
 
-    end_time = time.time()
+    elapsed = time.time() - start_time
 
     # Check final value
-    client = HazelcastClient(
-        cluster_name=CLUSTER_NAME,
+    client = make_client()
+    final_value = sum(
+        client.cp_subsystem.get_atomic_long(key).get().result() for key in keys
     )
-    atomic_long = client.cp_subsystem.get_atomic_long(COUNTER_KEY)
-    final_value = atomic_long.get().result()
+    client.shutdown()
 
     logger.info("=" * 50)
-    logger.info(f"All processes completed in {end_time - start_time:.2f} seconds")
+    logger.info(f"All processes completed in {elapsed:.2f} seconds")
     logger.info(f"Expected value: {expected_total}")
     logger.info(f"Actual value:   {final_value}")
     logger.info(f"Lost updates:   {expected_total - final_value}")
     logger.info("=" * 50)
 
-    client.shutdown()
+    return {
+        "strategy": name,
+        "elapsed": elapsed,
+        "ops_per_second": expected_total / elapsed if elapsed > 0 else 0.0,
+        "lost": expected_total - final_value,
+    }
+
+
+if __name__ == "__main__":
+    # Configuration
+    num_processes = 10
+    iterations_per_process = 10_000
+    # every key is a separate CP object, so keep the key count modest
+    key_chooser = make_key_chooser(KeyDistribution.SINGLE)
+    strategies = list(STRATEGIES)
+
+    results = [
+        run_strategy(name, num_processes, iterations_per_process, key_chooser)
+        for name in strategies
+    ]
+
+    logger.info(f"{'strategy':<24} {'elapsed s':>10} {'ops/s':>10} {'lost':>8}")
+    for result in results:
+        logger.info(
+            f"{result['strategy']:<24} {result['elapsed']:>10.2f} "
+            f"{result['ops_per_second']:>10.1f} {result['lost']:>8}"
+        )
@@ -1,8 +1,14 @@
+import argparse
+from collections import Counter
+import functools
 import logging
 from multiprocessing import Process
 import time
 
+from entry_processors import IncrementEntryProcessor
 import hazelcast
+from retry import RetryPolicy, RetryStats
+from workload import KeyChooser, KeyDistribution, make_key_chooser
 
 
 logging.basicConfig(
@@ -15,101 +21,258 @@ logger = logging.getLogger(__name__)
 MAP_NAME = "my-distributed-map"
 CLUSTER_NAME = "hello-world"
 COUNTER_KEY = "counter"
+CAS_RETRY_POLICY = RetryPolicy(base_delay=0.0005, max_delay=0.05, max_attempts=100)
+SINGLE_KEY = KeyChooser()
+BATCH_SIZE = 100
+# reads are served from the client's memory, the member invalidates them on writes
+NEAR_CACHE_CONFIG = {
+    MAP_NAME: {
+        "invalidate_on_change": True,
+        "eviction_max_size": 100_000,
+    }
+}
 
 
-def increment_counter_naive(process_id, iterations):
-    """Race condition worker"""
-    client = hazelcast.HazelcastClient(
+def counter_key(key: int) -> str:
+    return f"{COUNTER_KEY}:{key}"
+
+
+def make_client(near_cache: bool = False):
+    return hazelcast.HazelcastClient(
         cluster_name=CLUSTER_NAME,
+        near_caches=NEAR_CACHE_CONFIG if near_cache else {},
     )
 
+
+def increment_counter_naive(
+    process_id, iterations, key_chooser: KeyChooser = SINGLE_KEY
+):
+    """Race condition worker"""
+    client = make_client()
+
     distributed_map = client.get_map(MAP_NAME).blocking()
     logger.info(f"Process {process_id} started")
 
     for i in range(iterations):
         if i % 1000 == 0:
             logger.info(f"Process {process_id} - Iteration {i}")
-        current_value = distributed_map.get(COUNTER_KEY)
+        key = counter_key(key_chooser.next())
+        current_value = distributed_map.get(key)
 
-        distributed_map.put(COUNTER_KEY, current_value + 1)
+        distributed_map.put(key, current_value + 1)
 
     logger.info(f"Process {process_id} finished")
     client.shutdown()
 
 
-def increment_counter_pessimistic_lock(process_id, iterations):
-    client = hazelcast.HazelcastClient(
-        cluster_name=CLUSTER_NAME,
-    )
+def increment_counter_pessimistic_lock(
+    process_id, iterations, key_chooser: KeyChooser = SINGLE_KEY
+):
+    client = make_client()
     distributed_map = client.get_map(MAP_NAME).blocking()
     logger.info(f"Process {process_id} started")
 
     for i in range(iterations):
         if i % 1000 == 0:
             logger.info(f"Process {process_id} - Iteration {i}")
+        key = counter_key(key_chooser.next())
         try:
-            distributed_map.lock(COUNTER_KEY)
-            current_value = distributed_map.get(COUNTER_KEY)
-            distributed_map.put(COUNTER_KEY, current_value + 1)
+            distributed_map.lock(key)
+            current_value = distributed_map.get(key)
+            distributed_map.put(key, current_value + 1)
         finally:
-            distributed_map.unlock(COUNTER_KEY)
+            distributed_map.unlock(key)
 
     logger.info(f"Process {process_id} finished")
     client.shutdown()
 
 
-def increment_counter_optimistic_lock(process_id, iterations):
-    client = hazelcast.HazelcastClient(
-        cluster_name=CLUSTER_NAME,
-    )
+def increment_counter_optimistic_lock(
+    process_id,
+    iterations,
+    key_chooser: KeyChooser = SINGLE_KEY,
+    retry_policy: RetryPolicy = CAS_RETRY_POLICY,
+):
+    """CAS worker, lost races are retried with exponential backoff and jitter"""
+    client = make_client()
     distributed_map = client.get_map(MAP_NAME).blocking()
     logger.info(f"Process {process_id} started")
+    stats = RetryStats()
 
     for i in range(iterations):
         if i % 1000 == 0:
             logger.info(f"Process {process_id} - Iteration {i}")
 
-        while True:
-            current_value = distributed_map.get(COUNTER_KEY)
+        key = counter_key(key_chooser.next())
+        for _ in retry_policy.attempts(stats):
+            current_value = distributed_map.get(key)
             new_value = current_value + 1
-            result = distributed_map.replace_if_same(
-                COUNTER_KEY, current_value, new_value
-            )
+            result = distributed_map.replace_if_same(key, current_value, new_value)
             if result:
                 break
+        else:
+            logger.warning(
+                f"Process {process_id} gave up on iteration {i} after "
+                f"{retry_policy.max_attempts} attempts"
+            )
+
+    logger.info(
+        f"Process {process_id} finished - attempts: {stats.attempts}, "
+        f"conflicts: {stats.retries}, gave up: {stats.exhausted}, "
+        f"time wasted on retries: {stats.wasted_seconds:.2f}s"
+    )
+    client.shutdown()
+
+
+def increment_counter_entry_processor(
+    process_id, iterations, key_chooser: KeyChooser = SINGLE_KEY
+):
+    """Server-side increment, one round trip and no lost updates"""
+    client = make_client()
+    distributed_map = client.get_map(MAP_NAME).blocking()
+    increment = IncrementEntryProcessor(1)
+    logger.info(f"Process {process_id} started")
+
+    for i in range(iterations):
+        if i % 1000 == 0:
+            logger.info(f"Process {process_id} - Iteration {i}")
+        distributed_map.execute_on_key(counter_key(key_chooser.next()), increment)
 
     logger.info(f"Process {process_id} finished")
     client.shutdown()
 
 
-if __name__ == "__main__":
-    # Initialize the counter
-    client = hazelcast.HazelcastClient(
-        cluster_name="hello-world",
-    )
+def _batches(iterations: int, key_chooser: KeyChooser, batch_size: int):
+    """Yield {key: increments} for every batch_size increments"""
+    for batch_start in range(0, iterations, batch_size):
+        size = min(batch_size, iterations - batch_start)
+        yield Counter(counter_key(key_chooser.next()) for _ in range(size))
+
 
+def increment_counter_batched(
+    process_id,
+    iterations,
+    key_chooser: KeyChooser = SINGLE_KEY,
+    batch_size: int = BATCH_SIZE,
+):
+    """get_all + put_all per batch, race condition worker like naive"""
+    client = make_client()
     distributed_map = client.get_map(MAP_NAME).blocking()
-    distributed_map.put("counter", 0)
-    logger.info("Counter initialized to 0")
+    logger.info(f"Process {process_id} started")
+
+    for increments in _batches(iterations, key_chooser, batch_size):
+        current_values = distributed_map.get_all(list(increments))
+        distributed_map.put_all({
+            key: current_values[key] + delta for key, delta in increments.items()
+        })
+
+    logger.info(f"Process {process_id} finished")
     client.shutdown()
 
-    # Configuration
-    num_processes = 10
-    iterations_per_process = 10_000
+
+def increment_counter_batched_entry_processor(
+    process_id,
+    iterations,
+    key_chooser: KeyChooser = SINGLE_KEY,
+    batch_size: int = BATCH_SIZE,
+):
+    """execute_on_keys per batch, one call per distinct delta, no lost updates"""
+    client = make_client()
+    distributed_map = client.get_map(MAP_NAME).blocking()
+    logger.info(f"Process {process_id} started")
+
+    for increments in _batches(iterations, key_chooser, batch_size):
+        keys_by_delta = {}
+        for key, delta in increments.items():
+            keys_by_delta.setdefault(delta, []).append(key)
+        for delta, keys in keys_by_delta.items():
+            distributed_map.execute_on_keys(keys, IncrementEntryProcessor(delta))
+
+    logger.info(f"Process {process_id} finished")
+    client.shutdown()
+
+
+def read_heavy_counter(
+    process_id,
+    iterations,
+    key_chooser: KeyChooser = SINGLE_KEY,
+    reads_per_write: int = 9,
+    near_cache: bool = False,
+):
+    """Reads a counter `reads_per_write` times per entry processor increment"""
+    client = make_client(near_cache)
+    distributed_map = client.get_map(MAP_NAME).blocking()
+    increment = IncrementEntryProcessor(1)
+    logger.info(f"Process {process_id} started, near cache: {near_cache}")
+
+    for i in range(iterations):
+        if i % 1000 == 0:
+            logger.info(f"Process {process_id} - Iteration {i}")
+        key = counter_key(key_chooser.next())
+        for _ in range(reads_per_write):
+            distributed_map.get(key)
+        distributed_map.execute_on_key(key, increment)
+
+    logger.info(f"Process {process_id} finished")
+    client.shutdown()
+
+
+STRATEGIES = {
+    "naive": increment_counter_naive,
+    "pessimistic_lock": increment_counter_pessimistic_lock,
+    "optimistic_lock": increment_counter_optimistic_lock,
+    "entry_processor": increment_counter_entry_processor,
+    "batched": increment_counter_batched,
+    "batched_entry_processor": increment_counter_batched_entry_processor,
+    "read_heavy": read_heavy_counter,
+    "read_heavy_near_cache": functools.partial(read_heavy_counter, near_cache=True),
+}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Hazelcast map counter strategies")
+    parser.add_argument(
+        "--strategies",
+        nargs="+",
+        choices=list(STRATEGIES),
+        # entry processor strategies need the member setup from the README
+        default=["naive", "pessimistic_lock", "optimistic_lock", "batched"],
+    )
+    return parser.parse_args()
+
+
+def run_strategy(
+    name: str, num_processes: int, iterations_per_process: int, key_chooser
+) -> dict:
     expected_total = num_processes * iterations_per_process
+    keys = [
+        counter_key(key)
+        for key in range(key_chooser.first_key, key_chooser.last_key + 1)
+    ]
+
+    # Initialize the counters
+    client = make_client()
+    distributed_map = client.get_map(MAP_NAME).blocking()
+    distributed_map.put_all(dict.fromkeys(keys, 0))
+    logger.info(f"{len(keys)} counters initialized to 0")
+    client.shutdown()
 
     logger.info(
-        f"Starting {num_processes} processes, each doing {iterations_per_process} increments"
+        f"{name}: starting {num_processes} processes, "
+        f"each doing {iterations_per_process} increments"
     )
+    logger.info(f"Keys: {key_chooser.describe()}")
     logger.info(f"Expected final value: {expected_total}")
 
     # Create and start processes
     processes = []
     start_time = time.time()
 
-    target_func = increment_counter_optimistic_lock
     for process_id in range(num_processes):
-        p = Process(target=target_func, args=(process_id, iterations_per_process))
+        p = Process(
+            target=STRATEGIES[name],
+            args=(process_id, iterations_per_process, key_chooser),
+        )
         processes.append(p)
         p.start()
 
@@ -117,20 +280,45 @@ if __name__ == "__main__":
     for p in processes:
         p.join()
 
-    end_time = time.time()
+    elapsed = time.time() - start_time
 
     # Check final value
-    client = hazelcast.HazelcastClient(
-        cluster_name=CLUSTER_NAME,
-    )
+    client = make_client()
     distributed_map = client.get_map(MAP_NAME).blocking()
-    final_value = distributed_map.get(COUNTER_KEY)
+    final_value = sum(distributed_map.get_all(keys).values())
+    client.shutdown()
 
     logger.info("=" * 50)
-    logger.info(f"All processes completed in {end_time - start_time:.2f} seconds")
+    logger.info(f"All processes completed in {elapsed:.2f} seconds")
     logger.info(f"Expected value: {expected_total}")
     logger.info(f"Actual value:   {final_value}")
     logger.info(f"Lost updates:   {expected_total - final_value}")
     logger.info("=" * 50)
 
-    client.shutdown()
+    return {
+        "strategy": name,
+        "elapsed": elapsed,
+        "ops_per_second": expected_total / elapsed if elapsed > 0 else 0.0,
+        "lost": expected_total - final_value,
+    }
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    # Configuration
+    num_processes = 10
+    iterations_per_process = 10_000
+    # e.g. make_key_chooser(KeyDistribution.ZIPFIAN, keys=1000, skew=1.1)
+    key_chooser = make_key_chooser(KeyDistribution.SINGLE)
+
+    results = [
+        run_strategy(name, num_processes, iterations_per_process, key_chooser)
+        for name in args.strategies
+    ]
+
+    logger.info(f"{'strategy':<24} {'elapsed s':>10} {'ops/s':>10} {'lost':>8}")
+    for result in results:
+        logger.info(
+            f"{result['strategy']:<24} {result['elapsed']:>10.2f} "
+            f"{result['ops_per_second']:>10.1f} {result['lost']:>8}"
+        )
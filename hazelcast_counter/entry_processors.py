@@ -0,0 +1,30 @@
+from hazelcast.serialization.api import IdentifiedDataSerializable
+
+
+# must match CounterDataSerializableFactory on the members, see java/
+FACTORY_ID = 66
+INCREMENT_CLASS_ID = 1
+
+
+class IncrementEntryProcessor(IdentifiedDataSerializable):
+    """Adds `delta` to the map entry on the member that owns the key.
+
+    Only the delta is sent, the read-modify-write runs next to the data under
+    the partition lock, so it is atomic and costs a single round trip. The
+    processor returns the new value.
+    """
+
+    def __init__(self, delta: int = 1):
+        self.delta = delta
+
+    def write_data(self, object_data_output):
+        object_data_output.write_long(self.delta)
+
+    def read_data(self, object_data_input):
+        self.delta = object_data_input.read_long()
+
+    def get_factory_id(self):
+        return FACTORY_ID
+
+    def get_class_id(self):
+        return INCREMENT_CLASS_ID
@@ -0,0 +1,18 @@
+package ua.ucu.counter;
+
+import com.hazelcast.nio.serialization.DataSerializableFactory;
+import com.hazelcast.nio.serialization.IdentifiedDataSerializable;
+
+public class CounterDataSerializableFactory implements DataSerializableFactory {
+
+    public static final int FACTORY_ID = 66;
+    public static final int INCREMENT_CLASS_ID = 1;
+
+    @Override
+    public IdentifiedDataSerializable create(int typeId) {
+        if (typeId == INCREMENT_CLASS_ID) {
+            return new IncrementEntryProcessor();
+        }
+        return null;
+    }
+}
@@ -0,0 +1,50 @@
+package ua.ucu.counter;
+
+import com.hazelcast.map.EntryProcessor;
+import com.hazelcast.nio.ObjectDataInput;
+import com.hazelcast.nio.ObjectDataOutput;
+import com.hazelcast.nio.serialization.IdentifiedDataSerializable;
+
+import java.io.IOException;
+import java.util.Map;
+
+/**
+ * Server side of hazelcast_counter/entry_processors.py IncrementEntryProcessor.
+ */
+public class IncrementEntryProcessor
+        implements EntryProcessor<Object, Object, Long>, IdentifiedDataSerializable {
+
+    private long delta;
+
+    public IncrementEntryProcessor() {
+    }
+
+    @Override
+    public Long process(Map.Entry<Object, Object> entry) {
+        Object current = entry.getValue();
+        long value = current == null ? 0 : ((Number) current).longValue();
+        long updated = value + delta;
+        entry.setValue(updated);
+        return updated;
+    }
+
+    @Override
+    public void writeData(ObjectDataOutput out) throws IOException {
+        out.writeLong(delta);
+    }
+
+    @Override
+    public void readData(ObjectDataInput in) throws IOException {
+        delta = in.readLong();
+    }
+
+    @Override
+    public int getFactoryId() {
+        return CounterDataSerializableFactory.FACTORY_ID;
+    }
+
+    @Override
+    public int getClassId() {
+        return CounterDataSerializableFactory.INCREMENT_CLASS_ID;
+    }
+}
@@ -0,0 +1 @@
+../massive_insert/db_queries/retry.py
\ No newline at end of file
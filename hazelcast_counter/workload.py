@@ -0,0 +1 @@
+../massive_insert/db_queries/workload.py
\ No newline at end of file
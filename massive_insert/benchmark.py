@@ -0,0 +1,387 @@
+"""Sweep clients x iterations for each update strategy and save the results.
+
+Usage:
+    python benchmark.py --clients 1 10 50 --iterations 1000 \
+        --strategies atomic select_for_update --json results.json --csv results.csv
+    python benchmark.py --mode threads async --clients 10 100 1000 --iterations 100
+    python benchmark.py --strategies atomic --ops-per-transaction 1 10 100 --pipeline
+    python benchmark.py --distribution zipfian --keys 10000 --zipf-skew 1.2
+"""
+
+import argparse
+import asyncio
+from collections.abc import Callable
+import csv
+from dataclasses import dataclass, replace
+import functools
+import itertools
+import json
+import logging
+import pathlib
+
+from db_queries import async_concurrent_update
+from db_queries.async_concurrent_update import (
+    DEFAULT_MAX_CONNECTIONS,
+    perform_async_concurrent_update,
+)
+from db_queries.concurrent_update import (
+    advisory_lock_query,
+    atomic_increment_query,
+    cte_increment_query,
+    optimistic_locking_query,
+    perform_concurrent_update,
+    read_update_write_query,
+    select_for_update_query,
+    sharded_increment_query,
+    stored_procedure_query,
+)
+from db_queries.retry import (
+    DEFAULT_RETRY_POLICY,
+    OPTIMISTIC_RETRY_POLICY,
+    RetryPolicy,
+)
+from db_queries.shared import close_pool
+from db_queries.workload import KeyChooser, KeyDistribution, make_key_chooser
+from migrations.create_user_count import run_migration
+
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(threadName)-10s - %(levelname)s - %(message)s",
+)
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Strategy:
+    query_name: str
+    query_func: Callable
+    async_query_func: Callable
+    use_serializable: bool = False
+    enable_retry: bool = False
+    # doesn't read query results, so statements can be queued in a pipeline
+    pipelinable: bool = False
+    # retries its own conflicts, the query funcs take a `retry_policy`
+    retries_conflicts: bool = False
+
+
+STRATEGIES = {
+    "lost_updates": Strategy(
+        "Lost Updates",
+        read_update_write_query,
+        async_concurrent_update.read_update_write_query,
+    ),
+    "serializable": Strategy(
+        "Lost Updates (SERIALIZABLE)",
+        read_update_write_query,
+        async_concurrent_update.read_update_write_query,
+        use_serializable=True,
+        enable_retry=True,
+    ),
+    "atomic": Strategy(
+        "In Place update",
+        atomic_increment_query,
+        async_concurrent_update.atomic_increment_query,
+        pipelinable=True,
+    ),
+    "select_for_update": Strategy(
+        "SELECT FOR UPDATE",
+        select_for_update_query,
+        async_concurrent_update.select_for_update_query,
+    ),
+    "optimistic": Strategy(
+        "Optimistic Locking (Version)",
+        optimistic_locking_query,
+        async_concurrent_update.optimistic_locking_query,
+        retries_conflicts=True,
+    ),
+    "sharded": Strategy(
+        "Sharded In Place update",
+        sharded_increment_query,
+        async_concurrent_update.sharded_increment_query,
+        pipelinable=True,
+    ),
+    "stored_procedure": Strategy(
+        "Stored Procedure (PL/pgSQL)",
+        stored_procedure_query,
+        async_concurrent_update.stored_procedure_query,
+        pipelinable=True,
+    ),
+    "cte": Strategy(
+        "CTE UPDATE RETURNING",
+        cte_increment_query,
+        async_concurrent_update.cte_increment_query,
+        pipelinable=True,
+    ),
+    "advisory_lock": Strategy(
+        "Advisory Lock (PL/pgSQL)",
+        advisory_lock_query,
+        async_concurrent_update.advisory_lock_query,
+        pipelinable=True,
+    ),
+}
+
+MODES = ["threads", "async"]
+
+RESULT_FIELDS = [
+    "mode",
+    "strategy",
+    "query_name",
+    "clients",
+    "iterations_per_client",
+    "distribution",
+    "keys",
+    "ops_per_transaction",
+    "pipeline",
+    "expected",
+    "actual",
+    "lost",
+    "elapsed",
+    "operations",
+    "transactions",
+    "ops_per_second",
+    "mean_ms",
+    "p50_ms",
+    "p90_ms",
+    "p99_ms",
+    "p999_ms",
+    "max_ms",
+    "serialization_failures",
+    "conflicts",
+    "attempts",
+    "wasted_ms",
+    "retries_exhausted",
+    "failed_operations",
+]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, nargs="+", default=[10])
+    parser.add_argument("--iterations", type=int, nargs="+", default=[10_000])
+    parser.add_argument(
+        "--strategies",
+        nargs="+",
+        choices=list(STRATEGIES),
+        default=list(STRATEGIES),
+    )
+    parser.add_argument(
+        "--ops-per-transaction",
+        type=int,
+        nargs="+",
+        default=[1],
+        help="Increments applied per commit",
+    )
+    parser.add_argument(
+        "--pipeline",
+        action="store_true",
+        help="Queue each transaction's statements in a psycopg pipeline",
+    )
+    parser.add_argument(
+        "--distribution",
+        choices=list(KeyDistribution),
+        default=KeyDistribution.SINGLE,
+        help="How increments are spread over user ids",
+    )
+    parser.add_argument("--keys", type=int, default=1000, help="Number of user ids")
+    parser.add_argument("--zipf-skew", type=float, default=0.99)
+    parser.add_argument("--hot-fraction", type=float, default=0.2)
+    parser.add_argument("--hot-probability", type=float, default=0.8)
+    parser.add_argument("--mode", nargs="+", choices=MODES, default=["threads"])
+    parser.add_argument(
+        "--max-connections",
+        type=int,
+        default=DEFAULT_MAX_CONNECTIONS,
+        help="Connection cap for async mode, extra clients wait for a connection",
+    )
+    # retry options override both the serialization failure and the version
+    # conflict policy, unset ones keep the defaults of each
+    parser.add_argument(
+        "--retry-base-ms",
+        type=float,
+        help="Backoff before the first retry, doubles on every next one",
+    )
+    parser.add_argument("--retry-max-ms", type=float, help="Backoff cap")
+    parser.add_argument("--retry-attempts", type=int)
+    parser.add_argument(
+        "--retry-budget-ms",
+        type=float,
+        default=None,
+        help="Give up on an operation after this much time spent on it",
+    )
+    parser.add_argument("--json", dest="json_path", help="Write results as JSON")
+    parser.add_argument("--csv", dest="csv_path", help="Write results as CSV")
+    return parser.parse_args()
+
+
+def key_chooser_from_args(args) -> KeyChooser:
+    return make_key_chooser(
+        KeyDistribution(args.distribution),
+        keys=args.keys,
+        skew=args.zipf_skew,
+        hot_fraction=args.hot_fraction,
+        hot_probability=args.hot_probability,
+    )
+
+
+def retry_policy_from_args(args, default: RetryPolicy) -> RetryPolicy:
+    """`default` with the retry options given on the command line"""
+    overrides = {}
+    if args.retry_base_ms is not None:
+        overrides["base_delay"] = args.retry_base_ms / 1000
+    if args.retry_max_ms is not None:
+        overrides["max_delay"] = args.retry_max_ms / 1000
+    if args.retry_attempts is not None:
+        overrides["max_attempts"] = args.retry_attempts
+    if args.retry_budget_ms is not None:
+        overrides["budget"] = args.retry_budget_ms / 1000
+    return replace(default, **overrides)
+
+
+def run_single(
+    mode: str,
+    strategy: Strategy,
+    clients_amount: int,
+    iterations_per_client: int,
+    max_connections: int,
+    retry_policy: RetryPolicy = DEFAULT_RETRY_POLICY,
+    ops_per_transaction: int = 1,
+    pipeline: bool = False,
+    key_chooser: KeyChooser | None = None,
+    conflict_retry_policy: RetryPolicy = OPTIMISTIC_RETRY_POLICY,
+) -> dict:
+    query_func, async_query_func = strategy.query_func, strategy.async_query_func
+    if strategy.retries_conflicts:
+        query_func = functools.partial(query_func, retry_policy=conflict_retry_policy)
+        async_query_func = functools.partial(
+            async_query_func, retry_policy=conflict_retry_policy
+        )
+
+    if mode == "async":
+        return asyncio.run(
+            perform_async_concurrent_update(
+                clients_amount=clients_amount,
+                query_func=async_query_func,
+                query_name=strategy.query_name,
+                iterations_per_client=iterations_per_client,
+                enable_retry=strategy.enable_retry,
+                use_serializable=strategy.use_serializable,
+                max_connections=max_connections,
+                retry_policy=retry_policy,
+                ops_per_transaction=ops_per_transaction,
+                pipeline=pipeline,
+                key_chooser=key_chooser,
+            )
+        )
+    return perform_concurrent_update(
+        clients_amount=clients_amount,
+        query_func=query_func,
+        query_name=strategy.query_name,
+        iterations_per_client=iterations_per_client,
+        enable_retry=strategy.enable_retry,
+        use_serializable=strategy.use_serializable,
+        retry_policy=retry_policy,
+        ops_per_transaction=ops_per_transaction,
+        pipeline=pipeline,
+        key_chooser=key_chooser,
+    )
+
+
+def run_benchmark(
+    strategies: list[str],
+    clients: list[int],
+    iterations: list[int],
+    modes: list[str] = ("threads",),
+    max_connections: int = DEFAULT_MAX_CONNECTIONS,
+    retry_policy: RetryPolicy = DEFAULT_RETRY_POLICY,
+    ops_per_transaction: list[int] = (1,),
+    pipeline: bool = False,
+    key_chooser: KeyChooser | None = None,
+    conflict_retry_policy: RetryPolicy = OPTIMISTIC_RETRY_POLICY,
+) -> list[dict]:
+    results = []
+    for strategy_name in strategies:
+        strategy = STRATEGIES[strategy_name]
+        use_pipeline = pipeline and strategy.pipelinable
+        if pipeline and not use_pipeline:
+            logger.warning(
+                f"{strategy_name} reads query results, running without pipeline"
+            )
+
+        for mode, clients_amount, iterations_per_client, ops in itertools.product(
+            modes, clients, iterations, ops_per_transaction
+        ):
+            result = run_single(
+                mode,
+                strategy,
+                clients_amount,
+                iterations_per_client,
+                max_connections,
+                retry_policy,
+                ops,
+                use_pipeline,
+                key_chooser,
+                conflict_retry_policy,
+            )
+            results.append({"mode": mode, "strategy": strategy_name, **result})
+
+    return results
+
+
+def write_json(results: list[dict], path: str):
+    with pathlib.Path(path).open("w") as f:
+        json.dump(results, f, indent=2)
+    logger.info(f"Results written to {path}")
+
+
+def write_csv(results: list[dict], path: str):
+    with pathlib.Path(path).open("w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=RESULT_FIELDS, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(results)
+    logger.info(f"Results written to {path}")
+
+
+def log_summary(results: list[dict]):
+    logger.info("=" * 80)
+    logger.info(
+        f"{'mode':<8} {'strategy':<18} {'clients':>7} {'iters':>7} {'ops/tx':>6} "
+        f"{'ops/s':>10} {'p50 ms':>8} {'p99 ms':>8} {'lost':>7} {'ser.fail':>8} "
+        f"{'confl.':>7} {'wasted ms':>10}"
+    )
+    for r in results:
+        logger.info(
+            f"{r['mode']:<8} {r['strategy']:<18} {r['clients']:>7} "
+            f"{r['iterations_per_client']:>7} {r['ops_per_transaction']:>6} "
+            f"{r['ops_per_second']:>10.1f} {r['p50_ms']:>8.2f} {r['p99_ms']:>8.2f} "
+            f"{r['lost']:>7} {r['serialization_failures']:>8} {r['conflicts']:>7} "
+            f"{r['wasted_ms']:>10.1f}"
+        )
+    logger.info("=" * 80)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    run_migration()
+
+    try:
+        results = run_benchmark(
+            args.strategies,
+            args.clients,
+            args.iterations,
+            args.mode,
+            args.max_connections,
+            retry_policy_from_args(args, DEFAULT_RETRY_POLICY),
+            args.ops_per_transaction,
+            args.pipeline,
+            key_chooser_from_args(args),
+            retry_policy_from_args(args, OPTIMISTIC_RETRY_POLICY),
+        )
+    finally:
+        close_pool()
+    log_summary(results)
+
+    if args.json_path:
+        write_json(results, args.json_path)
+    if args.csv_path:
+        write_csv(results, args.csv_path)
@@ -0,0 +1,350 @@
+"""Asyncio versions of the concurrent update strategies.
+
+Every client is a coroutine instead of an OS thread, so runs can go to hundreds
+or thousands of clients. Results have the same shape as
+`perform_concurrent_update`, so both modes can be compared directly.
+"""
+
+import asyncio
+from collections.abc import Awaitable, Callable
+import logging
+import random
+import time
+
+from db_queries.metrics import WorkerStats
+from db_queries.retry import (
+    DEFAULT_RETRY_POLICY,
+    NO_RETRY,
+    OPTIMISTIC_RETRY_POLICY,
+    RetryBudgetExceededError,
+    RetryPolicy,
+    RetryStats,
+)
+from db_queries.shared import get_conninfo
+from db_queries.workload import KeyChooser
+from psycopg import errors
+from psycopg_pool import AsyncConnectionPool
+
+
+logger = logging.getLogger(__name__)
+
+# Postgres allows 100 connections by default, clients above this share them
+DEFAULT_MAX_CONNECTIONS = 90
+
+
+async def read_update_write_query(cursor, user_id: int):
+    """Query strategy: SELECT then UPDATE (prone to race conditions)"""
+    await cursor.execute("SELECT count FROM user_count WHERE user_id = %s", (user_id,))
+    result = await cursor.fetchone()
+    counter = result[0] + 1
+    await cursor.execute(
+        "UPDATE user_count SET count = %s WHERE user_id = %s", (counter, user_id)
+    )
+
+
+async def atomic_increment_query(cursor, user_id: int):
+    """Query strategy: Atomic UPDATE (no race conditions)"""
+    await cursor.execute(
+        "UPDATE user_count SET count = count + 1 WHERE user_id = %s", (user_id,)
+    )
+
+
+async def sharded_increment_query(cursor, user_id: int, shards: int = 16):
+    """Query strategy: Atomic UPDATE of a random shard row (spreads row locks)"""
+    await cursor.execute(
+        """
+        INSERT INTO user_count_shard (user_id, shard, count)
+        VALUES (%s, %s, 1)
+        ON CONFLICT (user_id, shard)
+        DO UPDATE SET count = user_count_shard.count + 1
+        """,
+        (user_id, random.randrange(shards)),
+    )
+
+
+async def select_for_update_query(cursor, user_id: int):
+    """Query strategy: SELECT FOR UPDATE then UPDATE (row-level locking)"""
+    await cursor.execute(
+        "SELECT count FROM user_count WHERE user_id = %s FOR UPDATE", (user_id,)
+    )
+    result = await cursor.fetchone()
+    counter = result[0] + 1
+    await cursor.execute(
+        "UPDATE user_count SET count = %s WHERE user_id = %s", (counter, user_id)
+    )
+
+
+async def stored_procedure_query(cursor, user_id: int):
+    """Query strategy: PL/pgSQL function doing SELECT FOR UPDATE + UPDATE (one round trip)"""
+    await cursor.execute("SELECT increment_user_count(%s)", (user_id,))
+
+
+async def cte_increment_query(cursor, user_id: int):
+    """Query strategy: locking read and UPDATE in one CTE statement"""
+    await cursor.execute(
+        """
+        WITH current AS (
+            SELECT user_id, count FROM user_count WHERE user_id = %s FOR UPDATE
+        )
+        UPDATE user_count
+        SET count = current.count + 1
+        FROM current
+        WHERE user_count.user_id = current.user_id
+        RETURNING user_count.count
+        """,
+        (user_id,),
+    )
+
+
+async def advisory_lock_query(cursor, user_id: int):
+    """Query strategy: PL/pgSQL function serialized by pg_advisory_xact_lock"""
+    await cursor.execute("SELECT increment_user_count_advisory(%s)", (user_id,))
+
+
+async def optimistic_locking_query(
+    cursor, user_id: int, retry_policy: RetryPolicy = OPTIMISTIC_RETRY_POLICY
+) -> RetryStats:
+    """Query strategy: Optimistic concurrency control using version field
+
+    Conflicts are retried with backoff, returns the retry stats of the update.
+    """
+    retry_stats = RetryStats()
+
+    async for _ in retry_policy.attempts_async(retry_stats):
+        await cursor.execute(
+            "SELECT count, version FROM user_count WHERE user_id = %s", (user_id,)
+        )
+        counter, version = await cursor.fetchone()
+
+        await cursor.execute(
+            "UPDATE user_count SET count = %s, version = %s WHERE user_id = %s AND version = %s",
+            (counter + 1, version + 1, user_id, version),
+        )
+
+        if cursor.rowcount > 0:
+            return retry_stats
+
+    raise RetryBudgetExceededError(retry_stats)
+
+
+async def _run_transaction(
+    conn, user_ids: list[int], query_func: Callable[..., Awaitable]
+) -> RetryStats:
+    """Apply one increment per user id and commit, returns strategy retry stats"""
+    retry_stats = RetryStats()
+    async with conn.cursor() as cursor:
+        for user_id in user_ids:
+            strategy_retry_stats = await query_func(cursor, user_id)
+            if strategy_retry_stats is not None:
+                retry_stats.merge(strategy_retry_stats)
+    await conn.commit()
+    return retry_stats
+
+
+async def async_worker(
+    pool: AsyncConnectionPool,
+    worker_id: int,
+    iterations: int,
+    key_chooser: KeyChooser,
+    query_func: Callable[..., Awaitable],
+    retry_policy: RetryPolicy,
+    stats: WorkerStats,
+    ops_per_transaction: int = 1,
+    pipeline: bool = False,
+):
+    """Client coroutine, borrows a pooled connection for every transaction"""
+    try:
+        for batch_start in range(0, iterations, ops_per_transaction):
+            ops = min(ops_per_transaction, iterations - batch_start)
+            # sorted to keep a single lock order across transactions
+            user_ids = sorted(key_chooser.next() for _ in range(ops))
+            start = time.perf_counter()
+
+            async with pool.connection() as conn:
+                async for _ in retry_policy.attempts_async(stats.retry):
+                    try:
+                        if pipeline:
+                            async with conn.pipeline():
+                                retry_stats = await _run_transaction(
+                                    conn, user_ids, query_func
+                                )
+                        else:
+                            retry_stats = await _run_transaction(
+                                conn, user_ids, query_func
+                            )
+                        stats.record_strategy_retries(retry_stats)
+                        stats.operations += ops
+                        stats.transactions += 1
+                        break
+                    except errors.SerializationFailure:
+                        await conn.rollback()
+                        stats.serialization_failures += 1
+                    except RetryBudgetExceededError as e:
+                        # the strategy gave up, the whole transaction is rolled back
+                        await conn.rollback()
+                        stats.record_strategy_retries(e.retry_stats)
+                        stats.failed_operations += ops
+                        break
+                else:
+                    stats.failed_operations += ops
+
+            stats.latency.record(time.perf_counter() - start)
+
+    except Exception as e:
+        logger.error(f"Worker {worker_id} error: {e}", exc_info=True)
+
+
+async def perform_async_concurrent_update(
+    clients_amount: int,
+    query_func: Callable[..., Awaitable],
+    query_name: str,
+    iterations_per_client: int = 10_000,
+    user_id: int = 1,
+    enable_retry: bool = False,
+    use_serializable: bool = False,
+    max_connections: int = DEFAULT_MAX_CONNECTIONS,
+    retry_policy: RetryPolicy = DEFAULT_RETRY_POLICY,
+    ops_per_transaction: int = 1,
+    pipeline: bool = False,
+    key_chooser: KeyChooser | None = None,
+):
+    """Asyncio counterpart of perform_concurrent_update
+
+    Args:
+        clients_amount: Number of concurrent clients (coroutines)
+        query_func: Async function that performs the update query
+        query_name: Name of the query strategy (for logging)
+        iterations_per_client: Number of iterations each client performs
+        user_id: User ID to update
+        enable_retry: Enable retry logic for serialization failures
+        use_serializable: Run transactions with SERIALIZABLE isolation
+        max_connections: Pool size cap, clients above it wait for a connection
+        retry_policy: Backoff for serialization failure retries
+        ops_per_transaction: Increments applied per commit
+        pipeline: Send each transaction's statements in one psycopg pipeline
+        key_chooser: Picks the user id of every increment, all of them hit
+            `user_id` if not given
+    """
+    expected_final_count = clients_amount * iterations_per_client
+    key_chooser = key_chooser or KeyChooser(1, user_id)
+    first_key, last_key = key_chooser.first_key, key_chooser.last_key
+    pool_size = min(clients_amount, max_connections)
+    isolation_level = "SERIALIZABLE" if use_serializable else "READ COMMITTED"
+
+    logger.info("=" * 80)
+    logger.info(f"Starting async concurrent update test: {query_name}")
+    logger.info(f"Number of clients: {clients_amount}, connections: {pool_size}")
+    logger.info(f"Iterations per client: {iterations_per_client}")
+    logger.info(f"Keys: {key_chooser.describe()}")
+    logger.info(f"Expected final count: {expected_final_count}")
+    logger.info(f"Transaction isolation level: {isolation_level.lower()}")
+    logger.info("=" * 80)
+
+    async def configure(conn):
+        await conn.execute(
+            f"SET SESSION CHARACTERISTICS AS TRANSACTION ISOLATION LEVEL {isolation_level}"
+        )
+        await conn.commit()
+
+    pool = AsyncConnectionPool(
+        get_conninfo(),
+        min_size=pool_size,
+        max_size=pool_size,
+        configure=configure,
+        open=False,
+    )
+    # open every connection before the clock starts
+    await pool.open(wait=True)
+
+    try:
+        async with pool.connection() as conn, conn.cursor() as cursor:
+            await cursor.execute(
+                """
+                INSERT INTO user_count (user_id, count, version)
+                SELECT user_id, 0, 0
+                FROM generate_series(%s::bigint, %s::bigint) AS user_id
+                ON CONFLICT (user_id) DO UPDATE SET count = 0, version = 0
+                """,
+                (first_key, last_key),
+            )
+            await cursor.execute(
+                "DELETE FROM user_count_shard WHERE user_id BETWEEN %s AND %s",
+                (first_key, last_key),
+            )
+
+        worker_stats = [WorkerStats() for _ in range(clients_amount)]
+        start_time = time.time()
+
+        await asyncio.gather(*[
+            async_worker(
+                pool,
+                i + 1,
+                iterations_per_client,
+                key_chooser,
+                query_func,
+                retry_policy if enable_retry else NO_RETRY,
+                worker_stats[i],
+                ops_per_transaction,
+                pipeline,
+            )
+            for i in range(clients_amount)
+        ])
+
+        elapsed = time.time() - start_time
+
+        async with pool.connection() as conn, conn.cursor() as cursor:
+            await cursor.execute(
+                "SELECT SUM(count) FROM user_count WHERE user_id BETWEEN %s AND %s",
+                (first_key, last_key),
+            )
+            final_count = (await cursor.fetchone())[0]
+            await cursor.execute(
+                """
+                SELECT COALESCE(SUM(count), 0) FROM user_count_shard
+                WHERE user_id BETWEEN %s AND %s
+                """,
+                (first_key, last_key),
+            )
+            final_count += (await cursor.fetchone())[0]
+    finally:
+        await pool.close()
+
+    stats = WorkerStats()
+    for single_worker_stats in worker_stats:
+        stats.merge(single_worker_stats)
+
+    latency = stats.latency.summary_ms()
+    ops_per_second = stats.operations / elapsed if elapsed > 0 else 0.0
+
+    logger.info("=" * 80)
+    logger.info(f"Query strategy: {query_name} (async)")
+    logger.info(f"Test completed in {elapsed:.2f} seconds")
+    logger.info(f"Expected final count: {expected_final_count}")
+    logger.info(f"Actual final count: {final_count}")
+    # operations that gave up after their retries never wrote, they aren't lost
+    lost = expected_final_count - stats.failed_operations - final_count
+    logger.info(f"Lost updates: {lost}")
+    logger.info(f"Failed operations: {stats.failed_operations}")
+    logger.info(f"Throughput: {ops_per_second:.2f} ops/s")
+    logger.info(
+        f"Latency ms - p50: {latency['p50_ms']}, p99: {latency['p99_ms']}, "
+        f"max: {latency['max_ms']}"
+    )
+    logger.info("=" * 80)
+
+    return {
+        "expected": expected_final_count,
+        "actual": final_count,
+        "lost": lost,
+        "elapsed": elapsed,
+        "query_name": query_name,
+        "clients": clients_amount,
+        "iterations_per_client": iterations_per_client,
+        "distribution": key_chooser.describe(),
+        "keys": key_chooser.keys,
+        "ops_per_transaction": ops_per_transaction,
+        "pipeline": pipeline,
+        "ops_per_second": ops_per_second,
+        **stats.summary(),
+        **latency,
+    }
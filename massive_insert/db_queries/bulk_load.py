@@ -0,0 +1,141 @@
+"""Bulk load user_count rows with binary COPY.
+
+Usage:
+    python -m db_queries.bulk_load --rows 1000000 --truncate
+    python -m db_queries.bulk_load --rows 1000000 --upsert
+"""
+
+import argparse
+from collections.abc import Iterable, Iterator
+import logging
+import random
+import time
+
+from db_queries.shared import close_pool, get_pool
+from migrations.create_user_count import run_migration
+
+
+logger = logging.getLogger(__name__)
+
+COPY_COLUMNS = "user_id, count, version"
+# binary COPY needs the exact postgres type of every column
+COPY_TYPES = ["int8", "int4", "int4"]
+
+
+def generate_user_counts(
+    rows: int, start_user_id: int = 1, max_count: int = 0
+) -> Iterator[tuple[int, int, int]]:
+    """Yield (user_id, count, version) rows with consecutive user ids"""
+    for user_id in range(start_user_id, start_user_id + rows):
+        count = random.randint(0, max_count) if max_count else 0
+        yield user_id, count, 0
+
+
+def copy_rows(cursor, table: str, rows: Iterable[tuple]) -> int:
+    """Stream rows into `table` with COPY FROM STDIN (FORMAT BINARY)"""
+    copied = 0
+    statement = f"COPY {table} ({COPY_COLUMNS}) FROM STDIN (FORMAT BINARY)"
+    with cursor.copy(statement) as copy:
+        copy.set_types(COPY_TYPES)
+        for row in rows:
+            copy.write_row(row)
+            copied += 1
+    return copied
+
+
+def _report(operation: str, rows: int, elapsed: float) -> dict:
+    rows_per_second = rows / elapsed if elapsed > 0 else 0.0
+    logger.info(
+        f"{operation}: {rows} rows in {elapsed:.2f}s ({rows_per_second:,.0f} rows/s)"
+    )
+    return {
+        "operation": operation,
+        "rows": rows,
+        "elapsed": elapsed,
+        "rows_per_second": rows_per_second,
+    }
+
+
+def bulk_load(rows: Iterable[tuple], truncate: bool = False) -> dict:
+    """COPY rows straight into user_count, existing user ids fail the load
+
+    Args:
+        rows: (user_id, count, version) tuples, e.g. from generate_user_counts
+        truncate: Empty user_count in the same transaction first
+    """
+    start = time.perf_counter()
+    with get_pool().connection() as conn, conn.cursor() as cursor:
+        if truncate:
+            cursor.execute("TRUNCATE user_count")
+        copied = copy_rows(cursor, "user_count", rows)
+        conn.commit()
+
+    return _report("copy", copied, time.perf_counter() - start)
+
+
+def bulk_upsert(rows: Iterable[tuple]) -> dict:
+    """COPY rows into a temp table, then merge them into user_count
+
+    Counts of existing user ids are added up and their version bumped, new
+    user ids are inserted as is. Rows repeating a user id are summed first, ON
+    CONFLICT can't update the same row twice in one statement.
+    """
+    start = time.perf_counter()
+    with get_pool().connection() as conn, conn.cursor() as cursor:
+        cursor.execute(
+            """
+            CREATE TEMP TABLE user_count_staging
+            (LIKE user_count INCLUDING DEFAULTS)
+            ON COMMIT DROP
+            """
+        )
+        copied = copy_rows(cursor, "user_count_staging", rows)
+        cursor.execute(
+            """
+            INSERT INTO user_count (user_id, count, version)
+            SELECT user_id, SUM(count), MAX(version) FROM user_count_staging
+            GROUP BY user_id
+            ON CONFLICT (user_id) DO UPDATE
+            SET count = user_count.count + EXCLUDED.count,
+                version = user_count.version + 1
+            """
+        )
+        conn.commit()
+
+    return _report("upsert", copied, time.perf_counter() - start)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--start-user-id", type=int, default=1)
+    parser.add_argument(
+        "--max-count", type=int, default=0, help="Seed counts randomly up to this"
+    )
+    parser.add_argument(
+        "--upsert",
+        action="store_true",
+        help="Merge through a temp table instead of a plain COPY",
+    )
+    parser.add_argument(
+        "--truncate", action="store_true", help="Empty user_count before a plain COPY"
+    )
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    )
+    args = parse_args()
+    run_migration()
+
+    rows = generate_user_counts(args.rows, args.start_user_id, args.max_count)
+    try:
+        if args.upsert:
+            bulk_upsert(rows)
+        else:
+            bulk_load(rows, truncate=args.truncate)
+    finally:
+        close_pool()
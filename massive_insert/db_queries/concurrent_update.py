@@ -1,9 +1,20 @@
 from collections.abc import Callable
 import logging
+import random
 import threading
 import time
 
-from db_queries.shared import get_db_connection
+from db_queries.metrics import WorkerStats
+from db_queries.retry import (
+    DEFAULT_RETRY_POLICY,
+    NO_RETRY,
+    OPTIMISTIC_RETRY_POLICY,
+    RetryBudgetExceededError,
+    RetryPolicy,
+    RetryStats,
+)
+from db_queries.shared import get_pool, set_session_isolation_level
+from db_queries.workload import KeyChooser
 from psycopg import errors
 
 
@@ -32,6 +43,19 @@ def atomic_increment_query(cursor, user_id: int):
     )
 
 
+def sharded_increment_query(cursor, user_id: int, shards: int = 16):
+    """Query strategy: Atomic UPDATE of a random shard row (spreads row locks)"""
+    cursor.execute(
+        """
+        INSERT INTO user_count_shard (user_id, shard, count)
+        VALUES (%s, %s, 1)
+        ON CONFLICT (user_id, shard)
+        DO UPDATE SET count = user_count_shard.count + 1
+        """,
+        (user_id, random.randrange(shards)),
+    )
+
+
 def select_for_update_query(cursor, user_id: int):
     """Query strategy: SELECT FOR UPDATE then UPDATE (row-level locking)"""
     cursor.execute(
@@ -44,11 +68,43 @@ def select_for_update_query(cursor, user_id: int):
     )
 
 
-def optimistic_locking_query(cursor, user_id: int):
-    """Query strategy: Optimistic concurrency control using version field"""
-    max_retries = 100  # Prevent infinite loop
+def stored_procedure_query(cursor, user_id: int):
+    """Query strategy: PL/pgSQL function doing SELECT FOR UPDATE + UPDATE (one round trip)"""
+    cursor.execute("SELECT increment_user_count(%s)", (user_id,))
+
+
+def cte_increment_query(cursor, user_id: int):
+    """Query strategy: locking read and UPDATE in one CTE statement"""
+    cursor.execute(
+        """
+        WITH current AS (
+            SELECT user_id, count FROM user_count WHERE user_id = %s FOR UPDATE
+        )
+        UPDATE user_count
+        SET count = current.count + 1
+        FROM current
+        WHERE user_count.user_id = current.user_id
+        RETURNING user_count.count
+        """,
+        (user_id,),
+    )
+
+
+def advisory_lock_query(cursor, user_id: int):
+    """Query strategy: PL/pgSQL function serialized by pg_advisory_xact_lock"""
+    cursor.execute("SELECT increment_user_count_advisory(%s)", (user_id,))
+
 
-    for attempt in range(max_retries):
+def optimistic_locking_query(
+    cursor, user_id: int, retry_policy: RetryPolicy = OPTIMISTIC_RETRY_POLICY
+) -> RetryStats:
+    """Query strategy: Optimistic concurrency control using version field
+
+    Conflicts are retried with backoff, returns the retry stats of the update.
+    """
+    retry_stats = RetryStats()
+
+    for _ in retry_policy.attempts(retry_stats):
         # Read current counter and version
         cursor.execute(
             "SELECT count, version FROM user_count WHERE user_id = %s", (user_id,)
@@ -68,51 +124,122 @@ def optimistic_locking_query(cursor, user_id: int):
 
         # Check if update succeeded
         if cursor.rowcount > 0:
-            break
+            return retry_stats
 
         # If we get here, someone else updated the row (version changed), retry
-        if attempt == max_retries - 1:
-            raise Exception(f"Optimistic locking failed after {max_retries} attempts")
+
+    raise RetryBudgetExceededError(retry_stats)
 
 
 def worker(
     worker_id: int,
     iterations: int,
-    user_id: int,
+    key_chooser: KeyChooser,
     query_func: Callable,
     enable_retry: bool,
+    stats: WorkerStats | None = None,
+    use_serializable: bool = False,
+    retry_policy: RetryPolicy = DEFAULT_RETRY_POLICY,
+    ops_per_transaction: int = 1,
+    pipeline: bool = False,
 ):
-    """Worker thread that performs concurrent updates using provided query function"""
+    """Worker thread that performs concurrent updates using provided query function
+
+    Per-transaction latency (including retries) and failure counts are collected
+    into `stats` if given. Serialization failures are retried with
+    `retry_policy` when `enable_retry` is set.
+    """
     logger.info(f"Worker {worker_id} starting with {iterations} iterations")
+    stats = stats if stats is not None else WorkerStats()
+
+    with get_pool().connection() as conn:
+        set_session_isolation_level(conn, use_serializable)
+        cursor = conn.cursor()
+        _run_iterations(
+            conn,
+            cursor,
+            worker_id,
+            iterations,
+            key_chooser,
+            query_func,
+            retry_policy if enable_retry else NO_RETRY,
+            stats,
+            ops_per_transaction,
+            pipeline,
+        )
+        cursor.close()
 
-    conn = get_db_connection()
-    cursor = conn.cursor()
 
-    try:
-        for i in range(iterations):
-            max_attempts = 10 if enable_retry else 1
+def _run_transaction(conn, cursor, user_ids: list[int], query_func: Callable):
+    """Apply one increment per user id and commit, returns strategy retry stats"""
+    retry_stats = RetryStats()
+    for user_id in user_ids:
+        strategy_retry_stats = query_func(cursor, user_id)
+        if strategy_retry_stats is not None:
+            retry_stats.merge(strategy_retry_stats)
+    conn.commit()
+    return retry_stats
 
-            for attempt in range(max_attempts):
+
+def _run_iterations(
+    conn,
+    cursor,
+    worker_id: int,
+    iterations: int,
+    key_chooser: KeyChooser,
+    query_func: Callable,
+    retry_policy: RetryPolicy,
+    stats: WorkerStats,
+    ops_per_transaction: int = 1,
+    pipeline: bool = False,
+):
+    try:
+        for batch_start in range(0, iterations, ops_per_transaction):
+            ops = min(ops_per_transaction, iterations - batch_start)
+            # sorted, so transactions touching several rows lock them in the same
+            # order and can't deadlock each other
+            user_ids = sorted(key_chooser.next() for _ in range(ops))
+            start = time.perf_counter()
+
+            for attempt in retry_policy.attempts(stats.retry):
                 try:
-                    query_func(cursor, user_id)
-                    conn.commit()
+                    if pipeline:
+                        # statements are queued and sent together with the commit
+                        with conn.pipeline():
+                            retry_stats = _run_transaction(
+                                conn, cursor, user_ids, query_func
+                            )
+                    else:
+                        retry_stats = _run_transaction(
+                            conn, cursor, user_ids, query_func
+                        )
+                    stats.record_strategy_retries(retry_stats)
+                    stats.operations += ops
+                    stats.transactions += 1
                     break
                 except errors.SerializationFailure:
                     conn.rollback()
-                    if attempt < max_attempts - 1:
-                        logger.warning(
-                            f"Worker {worker_id} serialization failure, retry {attempt + 1}/{max_attempts}"
-                        )
-                        time.sleep(0.3)  # simple backoff
-                        continue
+                    stats.serialization_failures += 1
+                    logger.debug(
+                        f"Worker {worker_id} serialization failure on attempt {attempt + 1}"
+                    )
+                except RetryBudgetExceededError as e:
+                    # the strategy gave up, the whole transaction is rolled back
+                    conn.rollback()
+                    stats.record_strategy_retries(e.retry_stats)
+                    stats.failed_operations += ops
+                    logger.debug(f"Worker {worker_id}: {e}")
+                    break
+            else:
+                stats.failed_operations += ops
+
+            stats.latency.record(time.perf_counter() - start)
 
         logger.info(f"Worker {worker_id} finished all {iterations} iterations")
 
     except Exception as e:
         logger.error(f"Worker {worker_id} error: {e}", exc_info=True)
-    finally:
-        cursor.close()
-        conn.close()
+        conn.rollback()
 
 
 def perform_concurrent_update(
@@ -122,9 +249,18 @@ def perform_concurrent_update(
     iterations_per_client: int = 10_000,
     user_id: int = 1,
     enable_retry: bool = False,
+    use_serializable: bool = False,
+    retry_policy: RetryPolicy = DEFAULT_RETRY_POLICY,
+    ops_per_transaction: int = 1,
+    pipeline: bool = False,
+    key_chooser: KeyChooser | None = None,
 ):
     """General wrapper function for concurrent update tests
 
+    Workers and setup share one connection pool, and the isolation level is set
+    per connection, so strategies can run back to back without touching
+    database-wide defaults.
+
     Args:
         clients_amount: Number of concurrent clients (threads)
         query_func: Function that performs the update query
@@ -132,49 +268,76 @@ def perform_concurrent_update(
         iterations_per_client: Number of iterations each client performs
         user_id: User ID to update
         enable_retry: Enable retry logic for serialization failures
+        use_serializable: Run worker transactions with SERIALIZABLE isolation
+        retry_policy: Backoff for serialization failure retries
+        ops_per_transaction: Increments applied per commit, a failed
+            transaction is retried as a whole
+        pipeline: Send each transaction's statements in one psycopg pipeline,
+            only for strategies that don't read query results
+        key_chooser: Picks the user id of every increment, all of them hit
+            `user_id` if not given
     """
     expected_final_count = clients_amount * iterations_per_client
+    key_chooser = key_chooser or KeyChooser(1, user_id)
+    first_key, last_key = key_chooser.first_key, key_chooser.last_key
 
     logger.info("=" * 80)
     logger.info(f"Starting concurrent update test: {query_name}")
     logger.info(f"Number of clients: {clients_amount}")
     logger.info(f"Iterations per client: {iterations_per_client}")
+    logger.info(f"Keys: {key_chooser.describe()}")
     logger.info(f"Expected final count: {expected_final_count}")
     logger.info(f"Retry on serialization failure: {enable_retry}")
+    logger.info(f"Ops per transaction: {ops_per_transaction}, pipeline: {pipeline}")
+    logger.info(
+        f"Transaction isolation level: {'serializable' if use_serializable else 'read committed'}"
+    )
     logger.info("=" * 80)
 
-    # Setup initial data
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SHOW transaction_isolation")
-    result = cursor.fetchone()
-    logger.info(f"Transaction isolation level: {result[0]}")
+    # One connection per worker plus one for setup and verification
+    pool = get_pool(clients_amount + 1)
 
-    try:
+    # Setup initial data
+    with pool.connection() as conn, conn.cursor() as cursor:
         cursor.execute(
             """
             INSERT INTO user_count (user_id, count, version)
-            VALUES (%s, 0, 0)
+            SELECT user_id, 0, 0
+            FROM generate_series(%s::bigint, %s::bigint) AS user_id
             ON CONFLICT (user_id) DO UPDATE SET count = 0, version = 0
         """,
-            (user_id,),
+            (first_key, last_key),
+        )
+        cursor.execute(
+            "DELETE FROM user_count_shard WHERE user_id BETWEEN %s AND %s",
+            (first_key, last_key),
         )
         conn.commit()
         logger.info(
-            f"Initial data setup complete: user_id={user_id}, count=0, version=0"
+            f"Initial data setup complete: user_id={first_key}..{last_key}, "
+            f"count=0, version=0"
         )
-    finally:
-        cursor.close()
-        conn.close()
 
     # Create and start worker threads
     threads = []
+    worker_stats = [WorkerStats() for _ in range(clients_amount)]
     start_time = time.time()
 
     for i in range(clients_amount):
         thread = threading.Thread(
             target=worker,
-            args=(i + 1, iterations_per_client, user_id, query_func, enable_retry),
+            args=(
+                i + 1,
+                iterations_per_client,
+                key_chooser,
+                query_func,
+                enable_retry,
+                worker_stats[i],
+                use_serializable,
+                retry_policy,
+                ops_per_transaction,
+                pipeline,
+            ),
             name=f"Worker-{i + 1}",
         )
         threads.append(thread)
@@ -187,38 +350,70 @@ def perform_concurrent_update(
     end_time = time.time()
     elapsed = end_time - start_time
 
+    stats = WorkerStats()
+    for single_worker_stats in worker_stats:
+        stats.merge(single_worker_stats)
+
     # Get final count
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    try:
+    with pool.connection() as conn, conn.cursor() as cursor:
         cursor.execute(
-            "SELECT count, version FROM user_count WHERE user_id = %s", (user_id,)
+            "SELECT SUM(count) FROM user_count WHERE user_id BETWEEN %s AND %s",
+            (first_key, last_key),
         )
-        result = cursor.fetchone()
-        final_count, final_version = result
-    finally:
-        cursor.close()
-        conn.close()
+        final_count = cursor.fetchone()[0]
+        # sharded strategies write to user_count_shard instead of the main row
+        cursor.execute(
+            """
+            SELECT COALESCE(SUM(count), 0) FROM user_count_shard
+            WHERE user_id BETWEEN %s AND %s
+            """,
+            (first_key, last_key),
+        )
+        final_count += cursor.fetchone()[0]
 
     logger.info("=" * 80)
     logger.info(f"Query strategy: {query_name}")
     logger.info(f"Test completed in {elapsed:.2f} seconds")
     logger.info(f"Expected final count: {expected_final_count}")
     logger.info(f"Actual final count: {final_count}")
-    logger.info(f"Lost updates: {expected_final_count - final_count}")
+    # operations that gave up after their retries never wrote, they aren't lost
+    lost = expected_final_count - stats.failed_operations - final_count
+    logger.info(f"Lost updates: {lost}")
 
     if expected_final_count > 0:
-        loss_percentage = (
-            (expected_final_count - final_count) / expected_final_count * 100
-        )
+        loss_percentage = lost / expected_final_count * 100
         logger.info(f"Loss percentage: {loss_percentage:.2f}%")
 
+    latency = stats.latency.summary_ms()
+    ops_per_second = stats.operations / elapsed if elapsed > 0 else 0.0
+    logger.info(f"Throughput: {ops_per_second:.2f} ops/s")
+    logger.info(
+        f"Latency ms - p50: {latency['p50_ms']}, p99: {latency['p99_ms']}, "
+        f"max: {latency['max_ms']}"
+    )
+    logger.info(
+        f"Serialization failures: {stats.serialization_failures}, "
+        f"conflicts: {stats.conflicts}, failed operations: {stats.failed_operations}"
+    )
+    logger.info(
+        f"Attempts: {stats.retry.attempts}, "
+        f"time wasted on retries: {stats.retry.wasted_seconds:.2f}s"
+    )
     logger.info("=" * 80)
 
     return {
         "expected": expected_final_count,
         "actual": final_count,
-        "lost": expected_final_count - final_count,
+        "lost": lost,
         "elapsed": elapsed,
         "query_name": query_name,
+        "clients": clients_amount,
+        "iterations_per_client": iterations_per_client,
+        "distribution": key_chooser.describe(),
+        "keys": key_chooser.keys,
+        "ops_per_transaction": ops_per_transaction,
+        "pipeline": pipeline,
+        "ops_per_second": ops_per_second,
+        **stats.summary(),
+        **latency,
     }
@@ -0,0 +1,120 @@
+from dataclasses import dataclass, field
+import math
+
+from db_queries.retry import RetryStats
+
+
+# 2^5 linear sub-buckets per power of two, ~3% relative error
+SUB_BUCKET_BITS = 5
+SUB_BUCKET_COUNT = 1 << SUB_BUCKET_BITS
+SUB_BUCKET_HALF = SUB_BUCKET_COUNT // 2
+# values above 2^37 us (~38 hours) are clamped into the last bucket
+MAX_SHIFT = 32
+
+
+class LatencyHistogram:
+    """Fixed-size log-linear histogram of latencies in microseconds"""
+
+    def __init__(self):
+        self.counts = [0] * (SUB_BUCKET_COUNT + MAX_SHIFT * SUB_BUCKET_HALF)
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    @staticmethod
+    def _index(value: int) -> int:
+        if value < SUB_BUCKET_COUNT:
+            return max(value, 0)
+        shift = min(value.bit_length() - SUB_BUCKET_BITS, MAX_SHIFT)
+        top = min(value >> shift, SUB_BUCKET_COUNT - 1)
+        return SUB_BUCKET_COUNT + (shift - 1) * SUB_BUCKET_HALF + top - SUB_BUCKET_HALF
+
+    @staticmethod
+    def _upper_bound(index: int) -> int:
+        if index < SUB_BUCKET_COUNT:
+            return index
+        shift, offset = divmod(index - SUB_BUCKET_COUNT, SUB_BUCKET_HALF)
+        return ((offset + SUB_BUCKET_HALF + 1) << (shift + 1)) - 1
+
+    def record(self, seconds: float) -> None:
+        value = int(seconds * 1_000_000)
+        self.counts[self._index(value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        for index, bucket_count in enumerate(other.counts):
+            self.counts[index] += bucket_count
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def percentile(self, percentile: float) -> int:
+        if self.count == 0:
+            return 0
+        target = max(math.ceil(percentile / 100 * self.count), 1)
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= target:
+                if index == len(self.counts) - 1:
+                    return self.max
+                return min(self._upper_bound(index), self.max)
+        return self.max
+
+    def summary_ms(self) -> dict:
+        """Mean and percentiles in milliseconds"""
+        return {
+            "mean_ms": round(self.total / self.count / 1000, 3) if self.count else 0.0,
+            "p50_ms": self.percentile(50) / 1000,
+            "p90_ms": self.percentile(90) / 1000,
+            "p99_ms": self.percentile(99) / 1000,
+            "p999_ms": self.percentile(99.9) / 1000,
+            "max_ms": self.max / 1000,
+        }
+
+
+@dataclass
+class WorkerStats:
+    """Counters collected by a single worker"""
+
+    operations: int = 0
+    transactions: int = 0
+    failed_operations: int = 0
+    # serialization failures caught by the worker's retry loop
+    serialization_failures: int = 0
+    # retries done inside a strategy, e.g. optimistic locking version conflicts
+    conflicts: int = 0
+    # one sample per transaction, including its retries
+    latency: LatencyHistogram = field(default_factory=LatencyHistogram)
+    # attempts and wasted time across worker and strategy retries
+    retry: RetryStats = field(default_factory=RetryStats)
+
+    def merge(self, other: "WorkerStats") -> None:
+        self.operations += other.operations
+        self.transactions += other.transactions
+        self.failed_operations += other.failed_operations
+        self.serialization_failures += other.serialization_failures
+        self.conflicts += other.conflicts
+        self.latency.merge(other.latency)
+        self.retry.merge(other.retry)
+
+    def record_strategy_retries(self, retry_stats: RetryStats | None) -> None:
+        """Add retries done inside a strategy, e.g. optimistic locking"""
+        if retry_stats is None:
+            return
+        self.conflicts += retry_stats.retries
+        self.retry.merge(retry_stats)
+
+    def summary(self) -> dict:
+        return {
+            "operations": self.operations,
+            "transactions": self.transactions,
+            "failed_operations": self.failed_operations,
+            "serialization_failures": self.serialization_failures,
+            "conflicts": self.conflicts,
+            "attempts": self.retry.attempts,
+            "retries_exhausted": self.retry.exhausted,
+            "wasted_ms": round(self.retry.wasted_seconds * 1000, 3),
+        }
@@ -0,0 +1,120 @@
+import asyncio
+from collections.abc import AsyncIterator, Iterator
+from dataclasses import dataclass
+import random
+import time
+
+
+@dataclass
+class RetryStats:
+    """Counters for every operation that went through a retry policy"""
+
+    attempts: int = 0
+    retries: int = 0
+    # operations that gave up after running out of attempts or budget
+    exhausted: int = 0
+    # time spent in failed attempts and backoff sleeps
+    wasted_seconds: float = 0.0
+
+    def merge(self, other: "RetryStats") -> None:
+        self.attempts += other.attempts
+        self.retries += other.retries
+        self.exhausted += other.exhausted
+        self.wasted_seconds += other.wasted_seconds
+
+
+class RetryBudgetExceededError(Exception):
+    """An operation ran out of attempts or budget, `retry_stats` tells how"""
+
+    def __init__(self, retry_stats: RetryStats):
+        super().__init__(f"Gave up after {retry_stats.attempts} attempts")
+        self.retry_stats = retry_stats
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """Exponential backoff with full jitter
+
+    The n-th retry sleeps a random time in [0, min(max_delay, base_delay * 2^n)],
+    so clients that conflicted together don't come back together.
+
+    Usage:
+        for _ in policy.attempts(stats):
+            try:
+                do_work()
+                break
+            except Conflict:
+                rollback()
+        else:
+            give_up()
+    """
+
+    base_delay: float = 0.001
+    max_delay: float = 0.1
+    max_attempts: int = 10
+    # max seconds per operation including backoff, None means attempts only
+    budget: float | None = None
+
+    def delay(self, retry: int) -> float:
+        cap = min(self.max_delay, self.base_delay * 2**retry)
+        return random.uniform(0, cap)
+
+    def _next_delay(self, retry: int, started: float) -> float | None:
+        """Backoff before the next attempt, None if the operation should give up"""
+        if retry >= self.max_attempts:
+            return None
+        delay = self.delay(retry - 1)
+        over_budget = (
+            self.budget is not None
+            and time.perf_counter() - started + delay > self.budget
+        )
+        if over_budget:
+            return None
+        return delay
+
+    def attempts(self, stats: RetryStats) -> Iterator[int]:
+        """Yield attempt numbers, backing off whenever the caller didn't break out"""
+        started = time.perf_counter()
+        attempt = 0
+        while True:
+            attempt_start = time.perf_counter()
+            stats.attempts += 1
+            yield attempt
+            # resumed, so the attempt failed
+            attempt += 1
+            delay = self._next_delay(attempt, started)
+            if delay is None:
+                stats.exhausted += 1
+                stats.wasted_seconds += time.perf_counter() - attempt_start
+                return
+            stats.retries += 1
+            time.sleep(delay)
+            stats.wasted_seconds += time.perf_counter() - attempt_start
+
+    async def attempts_async(self, stats: RetryStats) -> AsyncIterator[int]:
+        """Same as attempts, but sleeps with asyncio"""
+        started = time.perf_counter()
+        attempt = 0
+        while True:
+            attempt_start = time.perf_counter()
+            stats.attempts += 1
+            yield attempt
+            attempt += 1
+            delay = self._next_delay(attempt, started)
+            if delay is None:
+                stats.exhausted += 1
+                stats.wasted_seconds += time.perf_counter() - attempt_start
+                return
+            stats.retries += 1
+            await asyncio.sleep(delay)
+            stats.wasted_seconds += time.perf_counter() - attempt_start
+
+
+# single attempt, for runs without retries
+NO_RETRY = RetryPolicy(max_attempts=1)
+# retries on serialization failures
+DEFAULT_RETRY_POLICY = RetryPolicy(base_delay=0.001, max_delay=0.1, max_attempts=10)
+# version conflicts are cheap to retry, so start lower and allow more attempts
+OPTIMISTIC_RETRY_POLICY = RetryPolicy(
+    base_delay=0.0005, max_delay=0.05, max_attempts=100
+)
@@ -1,15 +1,20 @@
 import logging
 import os
+import threading
 
 import psycopg
+from psycopg_pool import ConnectionPool
 
 
 logger = logging.getLogger(__name__)
 
+_pool = None
+_pool_lock = threading.Lock()
 
-def get_db_connection():
-    """Create a new database connection"""
-    return psycopg.connect(
+
+def get_conninfo() -> str:
+    """Connection string built from DB_* environment variables"""
+    return psycopg.conninfo.make_conninfo(
         host=os.getenv("DB_HOST", "localhost"),
         dbname=os.getenv("DB_NAME", "mydb"),
         user=os.getenv("DB_USER", "postgres"),
@@ -18,15 +23,50 @@ def get_db_connection():
     )
 
 
-def set_transaction_isolation_level(conn, use_serializable: bool = False):
-    """Set transaction isolation level to READ COMMITTED (default) or SERIALIZABLE"""
-    isolation_level = "'serializable'" if use_serializable else "'read committed'"
+def _reset_connection(conn):
+    """Drop per-session settings (e.g. isolation level) when a connection is returned"""
+    conn.execute("RESET ALL")
+    conn.commit()
+
+
+def get_pool(size: int = 1) -> ConnectionPool:
+    """Return the shared pool, growing it to at least `size` open connections.
+
+    All connections are opened up front, so connection setup is not part of
+    the measured run.
+    """
+    global _pool
+
+    with _pool_lock:
+        if _pool is None:
+            _pool = ConnectionPool(
+                get_conninfo(),
+                min_size=size,
+                max_size=size,
+                reset=_reset_connection,
+                open=True,
+            )
+        elif _pool.max_size < size:
+            _pool.resize(min_size=size, max_size=size)
+        _pool.wait()
+        return _pool
+
+
+def close_pool():
+    global _pool
+
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+        _pool = None
+
+
+def set_session_isolation_level(conn, use_serializable: bool = False):
+    """Set isolation level of this connection only to READ COMMITTED or SERIALIZABLE"""
+    isolation_level = "SERIALIZABLE" if use_serializable else "READ COMMITTED"
 
     with conn.cursor() as cursor:
         cursor.execute(
-            f"ALTER DATABASE mydb SET DEFAULT_TRANSACTION_ISOLATION TO {isolation_level}"
+            f"SET SESSION CHARACTERISTICS AS TRANSACTION ISOLATION LEVEL {isolation_level}"
         )
-        conn.commit()
-        cursor.execute("SHOW default_transaction_isolation")
-        result = cursor.fetchone()
-        logger.info(f"Current isolation level: {result[0]}")
+    conn.commit()
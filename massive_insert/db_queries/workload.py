@@ -0,0 +1,114 @@
+import bisect
+from enum import StrEnum
+import itertools
+import random
+
+
+class KeyDistribution(StrEnum):
+    # every operation hits the same key, the worst case
+    SINGLE = "single"
+    UNIFORM = "uniform"
+    # rank r is picked with probability ~ 1 / r^skew
+    ZIPFIAN = "zipfian"
+    # hot_probability of operations go to the first hot_fraction of keys
+    HOTSPOT = "hotspot"
+
+
+class InvalidKeyCountError(ValueError):
+    """Key count below one"""
+
+    def __init__(self, keys: int):
+        super().__init__(f"Key count must be positive, got {keys}")
+
+
+class KeyChooser:
+    """Picks the key of the next operation from [first_key, first_key + keys)"""
+
+    def __init__(self, keys: int = 1, first_key: int = 1):
+        if keys < 1:
+            raise InvalidKeyCountError(keys)
+        self.keys = keys
+        self.first_key = first_key
+
+    @property
+    def last_key(self) -> int:
+        return self.first_key + self.keys - 1
+
+    def next(self) -> int:
+        return self.first_key
+
+    def describe(self) -> str:
+        return f"single key {self.first_key}"
+
+
+class UniformKeys(KeyChooser):
+    def next(self) -> int:
+        return self.first_key + random.randrange(self.keys)
+
+    def describe(self) -> str:
+        return f"uniform over {self.keys} keys"
+
+
+class ZipfianKeys(KeyChooser):
+    """Zipfian over key ranks, rank 1 is first_key
+
+    The cumulative weights are computed once, every pick is a binary search.
+    """
+
+    def __init__(self, keys: int = 1, first_key: int = 1, skew: float = 0.99):
+        super().__init__(keys, first_key)
+        self.skew = skew
+        self._cumulative = list(
+            itertools.accumulate(1 / rank**skew for rank in range(1, keys + 1))
+        )
+
+    def next(self) -> int:
+        point = random.random() * self._cumulative[-1]
+        return self.first_key + bisect.bisect_left(self._cumulative, point)
+
+    def describe(self) -> str:
+        return f"zipfian over {self.keys} keys, skew {self.skew}"
+
+
+class HotspotKeys(KeyChooser):
+    def __init__(
+        self,
+        keys: int = 1,
+        first_key: int = 1,
+        hot_fraction: float = 0.2,
+        hot_probability: float = 0.8,
+    ):
+        super().__init__(keys, first_key)
+        self.hot_fraction = hot_fraction
+        self.hot_probability = hot_probability
+        self._hot_keys = max(1, int(keys * hot_fraction))
+
+    def next(self) -> int:
+        cold_keys = self.keys - self._hot_keys
+        if cold_keys == 0 or random.random() < self.hot_probability:
+            return self.first_key + random.randrange(self._hot_keys)
+        cold_key = random.randrange(cold_keys)
+        return self.first_key + self._hot_keys + cold_key
+
+    def describe(self) -> str:
+        return (
+            f"hotspot over {self.keys} keys, {self.hot_probability:.0%} of operations "
+            f"on {self._hot_keys} hot keys"
+        )
+
+
+def make_key_chooser(
+    distribution: KeyDistribution = KeyDistribution.SINGLE,
+    keys: int = 1,
+    first_key: int = 1,
+    skew: float = 0.99,
+    hot_fraction: float = 0.2,
+    hot_probability: float = 0.8,
+) -> KeyChooser:
+    if distribution == KeyDistribution.UNIFORM:
+        return UniformKeys(keys, first_key)
+    elif distribution == KeyDistribution.ZIPFIAN:
+        return ZipfianKeys(keys, first_key, skew)
+    elif distribution == KeyDistribution.HOTSPOT:
+        return HotspotKeys(keys, first_key, hot_fraction, hot_probability)
+    return KeyChooser(1, first_key)
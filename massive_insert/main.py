@@ -1,13 +1,17 @@
 import logging
 
 from db_queries.concurrent_update import (
+    advisory_lock_query,
     atomic_increment_query,
+    cte_increment_query,
     optimistic_locking_query,
     perform_concurrent_update,
     read_update_write_query,
     select_for_update_query,
+    sharded_increment_query,
+    stored_procedure_query,
 )
-from db_queries.shared import get_db_connection, set_transaction_isolation_level
+from db_queries.shared import close_pool
 from migrations.create_user_count import run_migration
 
 
@@ -24,10 +28,6 @@ if __name__ == "__main__":
     clients_amount = 10
     iterations_per_client = 10_000
 
-    conn = get_db_connection()
-    set_transaction_isolation_level(conn=conn, use_serializable=False)
-    conn.close()
-
     # Test 1: Lost Updates
     perform_concurrent_update(
         clients_amount=clients_amount,
@@ -37,10 +37,6 @@ if __name__ == "__main__":
         enable_retry=False,
     )
 
-    conn = get_db_connection()
-    set_transaction_isolation_level(conn=conn, use_serializable=True)
-    conn.close()
-
     # Test 2: Lost Updates with serializable isolation level
     perform_concurrent_update(
         clients_amount=clients_amount,
@@ -48,12 +44,9 @@ if __name__ == "__main__":
         query_name="Lost Updates",
         iterations_per_client=iterations_per_client,
         enable_retry=True,
+        use_serializable=True,
     )
 
-    conn = get_db_connection()
-    set_transaction_isolation_level(conn=conn, use_serializable=False)
-    conn.close()
-
     # Test 3: In Place update
     perform_concurrent_update(
         clients_amount=clients_amount,
@@ -80,3 +73,41 @@ if __name__ == "__main__":
         iterations_per_client=iterations_per_client,
         enable_retry=False,
     )
+
+    # Test 6: Sharded atomic increment (row split into several shard rows)
+    perform_concurrent_update(
+        clients_amount=clients_amount,
+        query_func=sharded_increment_query,
+        query_name="Sharded In Place update",
+        iterations_per_client=iterations_per_client,
+        enable_retry=False,
+    )
+
+    # Test 7: SELECT FOR UPDATE + UPDATE inside a PL/pgSQL function
+    perform_concurrent_update(
+        clients_amount=clients_amount,
+        query_func=stored_procedure_query,
+        query_name="Stored Procedure (PL/pgSQL)",
+        iterations_per_client=iterations_per_client,
+        enable_retry=False,
+    )
+
+    # Test 8: Locking read + UPDATE in a single CTE statement
+    perform_concurrent_update(
+        clients_amount=clients_amount,
+        query_func=cte_increment_query,
+        query_name="CTE UPDATE RETURNING",
+        iterations_per_client=iterations_per_client,
+        enable_retry=False,
+    )
+
+    # Test 9: Read-modify-write serialized by a transaction advisory lock
+    perform_concurrent_update(
+        clients_amount=clients_amount,
+        query_func=advisory_lock_query,
+        query_name="Advisory Lock (PL/pgSQL)",
+        iterations_per_client=iterations_per_client,
+        enable_retry=False,
+    )
+
+    close_pool()
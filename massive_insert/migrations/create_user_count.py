@@ -12,7 +12,12 @@ logger = logging.getLogger(__name__)
 
 
 def run_migration():
-    """Create user_count table if not exists with user_id, count, and version fields"""
+    """Create user_count table if not exists with user_id, count, and version fields.
+
+    Also creates user_count_shard, where a single user's counter is split into
+    several rows to spread row-lock contention, and the PL/pgSQL functions used
+    by the server-side strategies.
+    """
     # Database connection parameters
     db_params = {
         "host": os.getenv("DB_HOST", "localhost"),
@@ -37,8 +42,69 @@ def run_migration():
                     );
                 """)
 
+            logger.info("Creating table user_count_shard if not exists...")
+
+            cur.execute("""
+                    CREATE TABLE IF NOT EXISTS user_count_shard (
+                        user_id BIGINT NOT NULL,
+                        shard INTEGER NOT NULL,
+                        count BIGINT NOT NULL DEFAULT 0,
+                        PRIMARY KEY (user_id, shard)
+                    );
+                """)
+
+            logger.info("Creating increment functions...")
+
+            # same read-modify-write as SELECT FOR UPDATE, but in one round trip
+            cur.execute("""
+                    CREATE OR REPLACE FUNCTION increment_user_count(p_user_id BIGINT)
+                    RETURNS INTEGER
+                    LANGUAGE plpgsql
+                    AS $$
+                    DECLARE
+                        current_count INTEGER;
+                    BEGIN
+                        SELECT count INTO current_count
+                        FROM user_count
+                        WHERE user_id = p_user_id
+                        FOR UPDATE;
+
+                        UPDATE user_count
+                        SET count = current_count + 1
+                        WHERE user_id = p_user_id;
+
+                        RETURN current_count + 1;
+                    END;
+                    $$;
+                """)
+
+            # serialized by a transaction-level advisory lock instead of the row lock,
+            # statements after the lock get a fresh snapshot in READ COMMITTED
+            cur.execute("""
+                    CREATE OR REPLACE FUNCTION increment_user_count_advisory(p_user_id BIGINT)
+                    RETURNS INTEGER
+                    LANGUAGE plpgsql
+                    AS $$
+                    DECLARE
+                        current_count INTEGER;
+                    BEGIN
+                        PERFORM pg_advisory_xact_lock(p_user_id);
+
+                        SELECT count INTO current_count
+                        FROM user_count
+                        WHERE user_id = p_user_id;
+
+                        UPDATE user_count
+                        SET count = current_count + 1
+                        WHERE user_id = p_user_id;
+
+                        RETURN current_count + 1;
+                    END;
+                    $$;
+                """)
+
             conn.commit()
-            logger.info("Table user_count created successfully!")
+            logger.info("Tables user_count and user_count_shard created successfully!")
 
     except Exception as e:
         logger.error("Error during migration: %s", e, exc_info=True)
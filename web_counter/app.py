@@ -2,11 +2,20 @@ from contextlib import asynccontextmanager
 import logging
 import pathlib
 import sys
+import time
 
-from domain.stats import StatsResponse
-from fastapi import FastAPI, Request
+from domain.stats import LatencyResponse, StatsResponse, StorageState, StorageSwitch
+from fastapi import FastAPI, HTTPException, Request
+from middleware.latency_tracker import LatencyTracker
 from middleware.request_tracker import RequestTracker
-from storage.factory import get_storage
+from middleware.shared_trackers import SharedLatencyTracker, SharedRequestTracker
+from storage.registry import (
+    StorageRegistry,
+    batch_config_from_env,
+    shards_from_env,
+    storage_names_from_env,
+)
+from utils.shared_memory import shared_dir
 
 
 # Configure logging
@@ -20,19 +29,34 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
-# Initialize storage
-storage = get_storage(storage_type="cassandra")
-
-# Initialize request tracker
-tracker = RequestTracker()
+# Initialize request and latency trackers, shared between workers under serve.py
+shared_state_dir = shared_dir()
+if shared_state_dir is not None:
+    tracker = SharedRequestTracker(shared_state_dir / "trackers")
+    latency_tracker = SharedLatencyTracker(shared_state_dir / "latency")
+else:
+    tracker = RequestTracker()
+    latency_tracker = LatencyTracker()
+
+# Initialize storages, the active one can be switched at runtime via /admin/storage
+shards, shard_mode = shards_from_env()
+storages = StorageRegistry(
+    latency_tracker=latency_tracker,
+    shared_dir=shared_state_dir / "storage" if shared_state_dir is not None else None,
+    batch_config=batch_config_from_env(),
+    shards=shards,
+    shard_mode=shard_mode,
+)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Handle application startup and shutdown."""
-    await storage.initialize()
+    name, warm = storage_names_from_env()
+    await storages.start(name, warm=warm)
     yield
     logger.info("Web Counter API shutting down")
+    await storages.close()
 
     # Cleanup: delete counter file if exists
     counter_file = "counter.txt"
@@ -48,18 +72,31 @@ app = FastAPI(title="Web Counter API", lifespan=lifespan)
 @app.middleware("http")
 async def track_inc_requests(request: Request, call_next):
     """Middleware to track all incoming requests."""
-    # Track request BEFORE processing
+    start = time.perf_counter()
+    response = await call_next(request)
+    elapsed = time.perf_counter() - start
+
     if request.url.path == "/inc":
-        await tracker.record()
+        tracker.record(latency_seconds=elapsed)
 
-    response = await call_next(request)
+    latency_tracker.record_request(_endpoint_name(request), elapsed)
     return response
 
 
+def _endpoint_name(request: Request) -> str:
+    """Endpoint key for latency stats, unknown paths share one key."""
+    # set by the router once a route matched, its path keeps the {parameters}
+    route = request.scope.get("route")
+    if route is None:
+        return "unmatched"
+    return f"{request.method} {route.path}"
+
+
 @app.post("/inc")
 async def increment_counter():
     """Increment the counter by 1 and return the new value."""
-    new_value = await storage.increment()
+    async with storages.use() as storage:
+        new_value = await storage.increment()
     logger.info(f"Counter incremented to {new_value}")
     return {"count": new_value}
 
@@ -67,7 +104,8 @@ async def increment_counter():
 @app.get("/count")
 async def get_counter():
     """Get the current counter value."""
-    current_value = await storage.get_count()
+    async with storages.use() as storage:
+        current_value = await storage.get_count()
     logger.info(f"Counter value retrieved: {current_value}")
     return {"count": current_value}
 
@@ -76,3 +114,55 @@ async def get_counter():
 async def get_stats():
     """Get RPS statistics."""
     return await tracker.get_stats()
+
+
+@app.get("/stats/latency", response_model=LatencyResponse)
+async def get_latency_stats():
+    """Get latency percentiles per endpoint and per storage backend."""
+    return latency_tracker.get_stats()
+
+
+async def _storage_state() -> StorageState:
+    # catch up with a switch made through another worker
+    await storages.current()
+    return StorageState(active=storages.active_name, warm=storages.warm)
+
+
+@app.get("/admin/storage", response_model=StorageState)
+async def get_storage_state():
+    """Get the active storage backend and the warm ones."""
+    return await _storage_state()
+
+
+@app.put("/admin/storage", response_model=StorageState)
+async def switch_storage(switch: StorageSwitch):
+    """Route requests to another storage backend, initializing it if needed.
+
+    With keep_warm false the previous backend is closed once the requests
+    running on it finish. Under serve.py only the worker handling this request
+    closes it, the other workers follow the switch but keep theirs warm.
+    """
+    previous = storages.active_name
+    try:
+        await storages.activate(switch.storage)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+    except Exception as e:
+        logger.exception(f"Storage {switch.storage} failed to initialize")
+        raise HTTPException(
+            status_code=503, detail=f"Storage {switch.storage} is unavailable: {e}"
+        ) from e
+
+    if not switch.keep_warm and previous not in {None, switch.storage}:
+        await storages.release(previous)
+    return await _storage_state()
+
+
+@app.delete("/admin/storage/{name}", response_model=StorageState)
+async def release_storage(name: str):
+    """Close a warm storage backend that is not active, in this worker only."""
+    try:
+        await storages.release(name)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e)) from e
+    return await _storage_state()
@@ -0,0 +1,64 @@
+from collections.abc import Iterator
+from dataclasses import dataclass
+from enum import StrEnum
+import math
+import random
+
+
+class ArrivalPattern(StrEnum):
+    # fixed interval of 1 / rate
+    CONSTANT = "constant"
+    # rate grows by step_rate every step_seconds
+    STEP = "step"
+    # rate grows linearly from rate to end_rate over the whole duration
+    RAMP = "ramp"
+    # exponential gaps with mean 1 / rate, like independent users
+    POISSON = "poisson"
+
+
+class InvalidArrivalSettingError(ValueError):
+    """Arrival setting that would stall or never end the schedule"""
+
+    def __init__(self, name: str, value: float):
+        super().__init__(f"Arrival {name} can't be {value}")
+
+
+@dataclass
+class ArrivalConfig:
+    pattern: ArrivalPattern = ArrivalPattern.CONSTANT
+    # requests per second, the starting rate for step and ramp
+    rate: float = 100.0
+    duration_seconds: float = 30.0
+    step_rate: float = 100.0
+    step_seconds: float = 5.0
+    end_rate: float = 1000.0
+
+    def __post_init__(self):
+        self.pattern = ArrivalPattern(self.pattern)
+        for name in ("rate", "duration_seconds", "step_seconds", "end_rate"):
+            if getattr(self, name) <= 0:
+                raise InvalidArrivalSettingError(name, getattr(self, name))
+        # a falling step rate would reach zero before the end of the run
+        if self.step_rate < 0:
+            raise InvalidArrivalSettingError("step_rate", self.step_rate)
+
+    def rate_at(self, elapsed: float) -> float:
+        if self.pattern == ArrivalPattern.STEP:
+            return self.rate + self.step_rate * math.floor(elapsed / self.step_seconds)
+        if self.pattern == ArrivalPattern.RAMP:
+            progress = min(elapsed / self.duration_seconds, 1.0)
+            return self.rate + (self.end_rate - self.rate) * progress
+        return self.rate
+
+
+def arrival_times(config: ArrivalConfig) -> Iterator[float]:
+    """Yield intended send times, in seconds from the start of the run"""
+    elapsed = 0.0
+    # tolerate float drift from summing many 1 / rate gaps
+    while elapsed < config.duration_seconds - 1e-9:
+        yield elapsed
+        rate = config.rate_at(elapsed)
+        if config.pattern == ArrivalPattern.POISSON:
+            elapsed += random.expovariate(rate)
+        else:
+            elapsed += 1 / rate
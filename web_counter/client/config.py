@@ -1,6 +1,11 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from enum import StrEnum
+import itertools
 import pathlib
 
+from client.arrival import ArrivalConfig
+from storage.batching_storage import BatchConfig, DurabilityMode
+from storage.sharding import ShardMode
 import yaml
 
 
@@ -9,16 +14,45 @@ class ServerConfig:
     url: str
 
 
+@dataclass
+class HttpClientConfig:
+    """Connection pool of the one httpx client shared by all simulated clients"""
+
+    max_connections: int = 100
+    max_keepalive_connections: int = 100
+    keepalive_expiry_seconds: float = 5.0
+    timeout_seconds: float = 10.0
+    # multiplexes requests over a few connections, needs an HTTP/2 capable server
+    http2: bool = False
+
+
+class LoadMode(StrEnum):
+    # every client waits for its previous response before sending the next request
+    CLOSED = "closed"
+    # requests are sent on an arrival schedule, whether or not earlier ones finished
+    OPEN = "open"
+
+
 @dataclass
 class LoadTestConfig:
     num_clients: int
     total_requests: int
+    mode: LoadMode = LoadMode.CLOSED
+    arrival: ArrivalConfig = field(default_factory=ArrivalConfig)
+    # clients, requests and arrival rate are split between the processes
+    processes: int = 1
+
+    def __post_init__(self):
+        self.mode = LoadMode(self.mode)
+        if isinstance(self.arrival, dict):
+            self.arrival = ArrivalConfig(**self.arrival)
 
 
 @dataclass
 class Config:
     server: ServerConfig
     load_test: LoadTestConfig
+    http: HttpClientConfig = field(default_factory=HttpClientConfig)
 
     @classmethod
     def from_yaml(cls, yaml_path: str) -> "Config":
@@ -28,4 +62,90 @@ class Config:
         return cls(
             server=ServerConfig(**data["server"]),
             load_test=LoadTestConfig(**data["load_test"]),
+            http=HttpClientConfig(**data.get("http", {})),
         )
+
+
+class ConcurrencyMode(StrEnum):
+    # coroutines on one event loop
+    ASYNCIO = "asyncio"
+    # OS threads sharing one storage instance
+    THREADS = "threads"
+    # separate processes, each with its own storage client
+    PROCESSES = "processes"
+
+
+@dataclass
+class ConcurrencyConfig:
+    mode: ConcurrencyMode
+    workers: int
+
+
+@dataclass
+class StrategyConfig:
+    name: str
+    shards: int = 1
+    shard_mode: ShardMode = ShardMode.RANDOM
+    # BatchConfig fields, no batching if not set
+    batch: dict | None = None
+
+    def batch_config(self) -> BatchConfig | None:
+        if self.batch is None:
+            return None
+        batch = dict(self.batch)
+        if "durability" in batch:
+            batch["durability"] = DurabilityMode(batch["durability"])
+        return BatchConfig(**batch)
+
+
+@dataclass
+class BenchmarkRun:
+    backend: str
+    concurrency: ConcurrencyConfig
+    strategy: StrategyConfig
+    operations: int
+
+
+@dataclass
+class BenchmarkConfig:
+    """Matrix of backend x concurrency x strategy, every cell is a separate run"""
+
+    operations: int
+    backends: list[str]
+    concurrency: list[ConcurrencyConfig]
+    strategies: list[StrategyConfig] = field(
+        default_factory=lambda: [StrategyConfig(name="plain")]
+    )
+
+    @classmethod
+    def from_yaml(cls, yaml_path: str) -> "BenchmarkConfig":
+        with pathlib.Path(yaml_path).open() as f:
+            data = yaml.safe_load(f)
+
+        return cls(
+            operations=data["operations"],
+            backends=data["backends"],
+            concurrency=[
+                ConcurrencyConfig(
+                    mode=ConcurrencyMode(item["mode"]), workers=item["workers"]
+                )
+                for item in data["concurrency"]
+            ],
+            strategies=[
+                StrategyConfig(
+                    name=item["name"],
+                    shards=item.get("shards", 1),
+                    shard_mode=ShardMode(item.get("shard_mode", ShardMode.RANDOM)),
+                    batch=item.get("batch"),
+                )
+                for item in data.get("strategies", [{"name": "plain"}])
+            ],
+        )
+
+    def runs(self) -> list[BenchmarkRun]:
+        return [
+            BenchmarkRun(backend, concurrency, strategy, self.operations)
+            for backend, concurrency, strategy in itertools.product(
+                self.backends, self.concurrency, self.strategies
+            )
+        ]
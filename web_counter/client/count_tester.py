@@ -1,10 +1,18 @@
 import asyncio
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field, replace
 import logging
+import multiprocessing
 import sys
+import time
 
-from client.config import Config
-from domain.stats import StatsResponse
+from client.arrival import arrival_times
+from client.config import Config, LoadMode
+from domain.stats import LatencyStats, StatsResponse
 import httpx
+from middleware.request_tracker import latency_stats
+from utils.histogram import LatencyHistogram
 
 
 logging.basicConfig(
@@ -12,60 +20,267 @@ logging.basicConfig(
     format="%(asctime)s - client - %(name)s - [%(filename)s:%(lineno)d] - %(levelname)s - %(message)s",
     handlers=[logging.StreamHandler(sys.stdout)],
 )
+# httpx logs every request at INFO, which costs more than the request itself
+logging.getLogger("httpx").setLevel(logging.WARNING)
 
 logger = logging.getLogger(__name__)
 
 
+def _to_us(seconds: float) -> int:
+    return int(seconds * 1_000_000)
+
+
+def _split(total: int, parts: int) -> list[int]:
+    """Split `total` between `parts` as evenly as possible"""
+    share, rest = divmod(total, parts)
+    return [share + (1 if i < rest else 0) for i in range(parts)]
+
+
+def _error_kind(error: Exception) -> str:
+    if isinstance(error, httpx.HTTPStatusError):
+        return f"HTTP {error.response.status_code}"
+    return type(error).__name__
+
+
+@dataclass
+class LoadStats:
+    """What one tester process measured, merged by the parent"""
+
+    # completion - actual send time, what a closed-loop tester reports
+    service: LatencyHistogram = field(default_factory=LatencyHistogram)
+    # open loop only: completion - intended send time, includes time spent
+    # waiting to be sent
+    corrected: LatencyHistogram = field(default_factory=LatencyHistogram)
+    # open loop only: actual - intended send time
+    send_lag: LatencyHistogram = field(default_factory=LatencyHistogram)
+    sent: int = 0
+    completed: int = 0
+    errors: Counter[str] = field(default_factory=Counter)
+    max_in_flight: int = 0
+    started: float = 0.0
+    finished: float = 0.0
+
+    @property
+    def elapsed(self) -> float:
+        return self.finished - self.started
+
+    def merge(self, other: "LoadStats") -> None:
+        self.service.merge(other.service)
+        self.corrected.merge(other.corrected)
+        self.send_lag.merge(other.send_lag)
+        self.sent += other.sent
+        self.completed += other.completed
+        self.errors.update(other.errors)
+        # processes run side by side, so their in-flight requests add up
+        self.max_in_flight += other.max_in_flight
+
+
+def split_config(config: Config) -> list[Config]:
+    """One config per tester process, together they generate the configured load"""
+    load_test = config.load_test
+    processes = load_test.processes
+    # a closed loop process without clients would send nothing, it isn't started
+    if load_test.mode == LoadMode.CLOSED:
+        processes = min(processes, load_test.num_clients)
+    shares = list(
+        zip(
+            _split(load_test.num_clients, processes),
+            _split(load_test.total_requests, processes),
+            strict=True,
+        )
+    )
+    arrival = load_test.arrival
+    process_arrival = replace(
+        arrival,
+        rate=arrival.rate / len(shares),
+        step_rate=arrival.step_rate / len(shares),
+        end_rate=arrival.end_rate / len(shares),
+    )
+
+    return [
+        replace(
+            config,
+            load_test=replace(
+                load_test,
+                num_clients=clients,
+                total_requests=requests,
+                arrival=process_arrival,
+                processes=1,
+            ),
+        )
+        for clients, requests in shares
+    ]
+
+
+def run_process(config: Config) -> LoadStats:
+    """Entry point of a tester process"""
+    return asyncio.run(CountTester(config).run_local())
+
+
 class CountTester:
     def __init__(self, config: Config):
         self.config = config
 
+    def make_client(self) -> httpx.AsyncClient:
+        http = self.config.http
+        return httpx.AsyncClient(
+            http2=http.http2,
+            timeout=http.timeout_seconds,
+            limits=httpx.Limits(
+                max_connections=http.max_connections,
+                max_keepalive_connections=http.max_keepalive_connections,
+                keepalive_expiry=http.keepalive_expiry_seconds,
+            ),
+        )
+
     async def send_inc_request(
-        self, client: httpx.AsyncClient, client_id: int, request_num: int
+        self,
+        client: httpx.AsyncClient,
+        stats: LoadStats,
+        intended_at: float | None = None,
     ) -> None:
-        endpoint = "/inc"
-        url = f"{self.config.server.url}{endpoint}"
+        """Send one request, open-loop latencies are also measured from `intended_at`"""
+        url = f"{self.config.server.url}/inc"
+        sent_at = time.perf_counter()
 
         try:
             response = await client.post(url)
             response.raise_for_status()
         except Exception as e:
-            logger.error(f"Client {client_id} - Request {request_num} - Failed: {e}")
+            stats.errors[_error_kind(e)] += 1
+            return
 
-    async def client_worker(self, client_id: int, requests_per_client: int) -> None:
+        finished_at = time.perf_counter()
+        stats.completed += 1
+        stats.service.record(_to_us(finished_at - sent_at))
+        if intended_at is not None:
+            stats.corrected.record(_to_us(finished_at - intended_at))
+            stats.send_lag.record(_to_us(sent_at - intended_at))
+
+    async def client_worker(
+        self, client: httpx.AsyncClient, requests_per_client: int, stats: LoadStats
+    ) -> None:
         """Worker coroutine that sends requests sequentially."""
-        async with httpx.AsyncClient() as client:
-            logger.info(
-                f"Client {client_id} starting - will send {requests_per_client} requests"
+        for _ in range(requests_per_client):
+            stats.sent += 1
+            await self.send_inc_request(client, stats)
+
+    async def run(self) -> None:
+        load_test = self.config.load_test
+        if load_test.processes > 1:
+            process_configs = split_config(self.config)
+            logger.info(f"Starting {len(process_configs)} tester processes")
+            loop = asyncio.get_running_loop()
+            with ProcessPoolExecutor(
+                max_workers=len(process_configs),
+                mp_context=multiprocessing.get_context("spawn"),
+            ) as executor:
+                results = await asyncio.gather(*[
+                    loop.run_in_executor(executor, run_process, process_config)
+                    for process_config in process_configs
+                ])
+
+            stats = LoadStats(
+                started=min(result.started for result in results),
+                finished=max(result.finished for result in results),
             )
+            for result in results:
+                stats.merge(result)
+        else:
+            stats = await self.run_local()
 
-            for request_num in range(requests_per_client):
-                await self.send_inc_request(client, client_id, request_num)
+        self.log_stats(stats)
+        await self.log_server_stats()
 
-            logger.info(f"Client {client_id} completed")
+    async def run_local(self) -> LoadStats:
+        stats = LoadStats()
+        async with self.make_client() as client:
+            stats.started = time.time()
+            if self.config.load_test.mode == LoadMode.OPEN:
+                await self.run_open_loop(client, stats)
+            else:
+                await self.run_closed_loop(client, stats)
+            stats.finished = time.time()
+        return stats
 
-    async def run(self) -> None:
+    async def run_open_loop(self, client: httpx.AsyncClient, stats: LoadStats) -> None:
+        """Send requests on the arrival schedule without waiting for responses
+
+        A slow response doesn't delay the next request, so queueing shows up in
+        the corrected latency instead of being hidden (coordinated omission).
+        """
+        arrival = self.config.load_test.arrival
         logger.info(
-            f"Starting test run: {self.config.load_test.num_clients} clients, "
-            f"{self.config.load_test.total_requests} total requests"
+            f"Starting open-loop run: {arrival.pattern} arrivals at {arrival.rate} rps "
+            f"for {arrival.duration_seconds}s over "
+            f"{self.config.http.max_connections} connections"
         )
 
-        requests_per_client = (
-            self.config.load_test.total_requests // self.config.load_test.num_clients
+        in_flight = set()
+        start = time.perf_counter()
+
+        for offset in arrival_times(arrival):
+            intended_at = start + offset
+            delay = intended_at - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            task = asyncio.create_task(
+                self.send_inc_request(client, stats, intended_at)
+            )
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+            stats.sent += 1
+            stats.max_in_flight = max(stats.max_in_flight, len(in_flight))
+
+        await asyncio.gather(*in_flight)
+
+    async def run_closed_loop(
+        self, client: httpx.AsyncClient, stats: LoadStats
+    ) -> None:
+        num_clients = self.config.load_test.num_clients
+        logger.info(
+            f"Starting test run: {num_clients} clients, "
+            f"{self.config.load_test.total_requests} total requests over "
+            f"{self.config.http.max_connections} connections"
         )
+        stats.max_in_flight = num_clients
 
-        # Create all client workers
-        client_tasks = [
-            self.client_worker(
-                client_id=client_id,
-                requests_per_client=requests_per_client,
+        # All clients share one connection pool
+        await asyncio.gather(*[
+            self.client_worker(client, requests_per_client, stats)
+            for requests_per_client in _split(
+                self.config.load_test.total_requests, num_clients
             )
-            for client_id in range(self.config.load_test.num_clients)
-        ]
+        ])
 
-        # Run all clients concurrently
-        await asyncio.gather(*client_tasks)
+    def log_stats(self, stats: LoadStats) -> None:
+        def log_latency(name: str, latency: LatencyStats) -> None:
+            logger.info(
+                f"{name} latency ms - p50: {latency.p50_ms}, p90: {latency.p90_ms}, "
+                f"p99: {latency.p99_ms}, p99.9: {latency.p999_ms}, "
+                f"max: {latency.max_ms}"
+            )
 
+        elapsed = stats.elapsed
+        logger.info(
+            f"Sent: {stats.sent}, completed: {stats.completed} in {elapsed:.2f}s "
+            f"({stats.completed / elapsed if elapsed > 0 else 0.0:.1f} rps), "
+            f"errors: {stats.errors.total()}, max in flight: {stats.max_in_flight}"
+        )
+        for kind, count in stats.errors.most_common():
+            logger.info(f"Errors - {kind}: {count}")
+
+        if self.config.load_test.mode == LoadMode.OPEN:
+            duration = self.config.load_test.arrival.duration_seconds
+            logger.info(f"Scheduled rate: {stats.sent / duration:.1f} rps")
+            log_latency("Corrected", latency_stats(stats.corrected))
+            log_latency("Service", latency_stats(stats.service))
+            log_latency("Send lag", latency_stats(stats.send_lag))
+        else:
+            log_latency("Client", latency_stats(stats.service))
+
+    async def log_server_stats(self) -> None:
         async with httpx.AsyncClient() as client:
             count_response = await client.get(f"{self.config.server.url}/count")
             logger.info(f"Final counter value: {count_response.json()['count']}")
@@ -77,6 +292,11 @@ class CountTester:
             )
             logger.info(f"Average RPS: {stats.avg_rps}")
             logger.info(f"Min RPS: {stats.min_rps}, Max RPS: {stats.max_rps}")
+            logger.info(
+                f"Latency ms - p50: {stats.latency.p50_ms}, p90: {stats.latency.p90_ms}, "
+                f"p99: {stats.latency.p99_ms}, p99.9: {stats.latency.p999_ms}, "
+                f"max: {stats.latency.max_ms}"
+            )
 
 
 async def main():
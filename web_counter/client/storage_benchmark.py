@@ -0,0 +1,341 @@
+"""Benchmark CounterStorage backends directly, without HTTP.
+
+Runs every backend x concurrency x strategy cell of a YAML matrix and prints one
+comparable table of throughput, latency percentiles and lost updates.
+
+Usage:
+    python -m client.storage_benchmark --config client/benchmark_matrix.yaml \
+        --json results.json --csv results.csv
+"""
+
+import argparse
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+import csv
+from dataclasses import dataclass, field
+import json
+import logging
+import multiprocessing
+import os
+import pathlib
+import shutil
+import sys
+import threading
+import time
+
+from client.config import BenchmarkConfig, BenchmarkRun, ConcurrencyMode
+from middleware.request_tracker import latency_stats
+from storage.factory import PROCESS_LOCAL_BACKENDS, get_storage
+from storage.storage import CounterStorage
+from utils.histogram import LatencyHistogram
+from utils.shared_memory import SHARED_DIR_ENV, create_shared_dir
+
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - benchmark - %(processName)s - %(levelname)s - %(message)s",
+    handlers=[logging.StreamHandler(sys.stdout)],
+)
+
+logger = logging.getLogger(__name__)
+
+RESULT_FIELDS = [
+    "backend",
+    "strategy",
+    "mode",
+    "workers",
+    "operations",
+    "errors",
+    "elapsed",
+    "ops_per_second",
+    "expected",
+    "actual",
+    "lost",
+    "mean_ms",
+    "p50_ms",
+    "p90_ms",
+    "p99_ms",
+    "p999_ms",
+    "max_ms",
+]
+
+
+@dataclass
+class SliceResult:
+    """What one process measured, merged by the parent"""
+
+    histogram: LatencyHistogram = field(default_factory=LatencyHistogram)
+    operations: int = 0
+    errors: int = 0
+    started: float = 0.0
+    finished: float = 0.0
+    count_before: int | None = None
+    count_after: int | None = None
+
+
+def _split(total: int, parts: int) -> list[int]:
+    """Split `total` operations between `parts` workers as evenly as possible"""
+    share, rest = divmod(total, parts)
+    return [share + (1 if i < rest else 0) for i in range(parts)]
+
+
+def _build_storage(run: BenchmarkRun) -> CounterStorage:
+    return get_storage(
+        storage_type=run.backend,
+        batch_config=run.strategy.batch_config(),
+        shards=run.strategy.shards,
+        shard_mode=run.strategy.shard_mode,
+    )
+
+
+async def _async_worker(
+    storage: CounterStorage, operations: int, result: SliceResult
+) -> None:
+    for _ in range(operations):
+        start = time.perf_counter()
+        try:
+            await storage.increment()
+        except Exception as e:
+            result.errors += 1
+            logger.debug(f"Increment failed: {e}")
+            continue
+        result.histogram.record(int((time.perf_counter() - start) * 1_000_000))
+        result.operations += 1
+
+
+async def _run_asyncio(
+    run: BenchmarkRun, workers: int, operations: int, measure_count: bool
+) -> SliceResult:
+    result = SliceResult()
+    storage = _build_storage(run)
+    await storage.initialize()
+    try:
+        if measure_count:
+            result.count_before = await storage.get_count()
+
+        result.started = time.time()
+        await asyncio.gather(*[
+            _async_worker(storage, share, result)
+            for share in _split(operations, workers)
+        ])
+        result.finished = time.time()
+
+        if measure_count:
+            result.count_after = await storage.get_count()
+    finally:
+        await storage.close()
+    return result
+
+
+def _run_threads(run: BenchmarkRun, workers: int, operations: int) -> SliceResult:
+    """Worker threads share one storage that lives on a background event loop"""
+    loop = asyncio.new_event_loop()
+    loop_thread = threading.Thread(target=loop.run_forever, daemon=True)
+    loop_thread.start()
+
+    def call(coro):
+        return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+    results = [SliceResult() for _ in range(workers)]
+
+    def thread_worker(share: int, thread_result: SliceResult):
+        for _ in range(share):
+            start = time.perf_counter()
+            try:
+                call(storage.increment())
+            except Exception as e:
+                thread_result.errors += 1
+                logger.debug(f"Increment failed: {e}")
+                continue
+            thread_result.histogram.record(
+                int((time.perf_counter() - start) * 1_000_000)
+            )
+            thread_result.operations += 1
+
+    result = SliceResult()
+    storage = _build_storage(run)
+    call(storage.initialize())
+    try:
+        result.count_before = call(storage.get_count())
+
+        threads = [
+            threading.Thread(target=thread_worker, args=(share, results[i]))
+            for i, share in enumerate(_split(operations, workers))
+        ]
+        result.started = time.time()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        result.finished = time.time()
+
+        result.count_after = call(storage.get_count())
+    finally:
+        call(storage.close())
+        loop.call_soon_threadsafe(loop.stop)
+        loop_thread.join()
+        loop.close()
+
+    for thread_result in results:
+        result.histogram.merge(thread_result.histogram)
+        result.operations += thread_result.operations
+        result.errors += thread_result.errors
+    return result
+
+
+def run_slice(
+    run: BenchmarkRun,
+    mode: ConcurrencyMode,
+    workers: int,
+    operations: int,
+    measure_count: bool,
+) -> SliceResult:
+    """Entry point of a benchmark process"""
+    if mode == ConcurrencyMode.THREADS:
+        return _run_threads(run, workers, operations)
+    return asyncio.run(_run_asyncio(run, workers, operations, measure_count))
+
+
+def read_count(run: BenchmarkRun) -> int:
+    async def _read() -> int:
+        storage = _build_storage(run)
+        await storage.initialize()
+        try:
+            return await storage.get_count()
+        finally:
+            await storage.close()
+
+    return asyncio.run(_read())
+
+
+def run_benchmark(run: BenchmarkRun) -> dict | None:
+    """Run one matrix cell
+
+    Every storage is a per-process singleton, so each run gets fresh spawned
+    processes and never reuses a client configured for another cell.
+    """
+    mode, workers = run.concurrency.mode, run.concurrency.workers
+    logger.info(
+        f"Running {run.backend} / {run.strategy.name} / {mode} x {workers}: "
+        f"{run.operations} increments"
+    )
+    context = multiprocessing.get_context("spawn")
+
+    if mode == ConcurrencyMode.PROCESSES:
+        if run.backend in PROCESS_LOCAL_BACKENDS:
+            logger.warning(f"{run.backend} is not shared between processes, skipped")
+            return None
+        # shared_memory finds its counter in the run directory, the way the
+        # serve.py workers do, spawned processes inherit the environment
+        directory = create_shared_dir()
+        os.environ[SHARED_DIR_ENV] = str(directory)
+        try:
+            with ProcessPoolExecutor(
+                max_workers=workers, mp_context=context, max_tasks_per_child=1
+            ) as executor:
+                # initialize() never resets the counter (reset() does), so every
+                # process adds to the same value and the delta is the actual count
+                count_before = executor.submit(read_count, run).result()
+                futures = [
+                    executor.submit(
+                        run_slice, run, ConcurrencyMode.ASYNCIO, 1, share, False
+                    )
+                    for share in _split(run.operations, workers)
+                ]
+                slices = [future.result() for future in futures]
+                count_after = executor.submit(read_count, run).result()
+        finally:
+            del os.environ[SHARED_DIR_ENV]
+            shutil.rmtree(directory, ignore_errors=True)
+    else:
+        with ProcessPoolExecutor(
+            max_workers=1, mp_context=context, max_tasks_per_child=1
+        ) as executor:
+            slices = [
+                executor.submit(
+                    run_slice, run, mode, workers, run.operations, True
+                ).result()
+            ]
+        count_before, count_after = slices[0].count_before, slices[0].count_after
+
+    histogram = LatencyHistogram()
+    for single_slice in slices:
+        histogram.merge(single_slice.histogram)
+    operations = sum(single_slice.operations for single_slice in slices)
+    errors = sum(single_slice.errors for single_slice in slices)
+    elapsed = max(s.finished for s in slices) - min(s.started for s in slices)
+    actual = count_after - count_before
+
+    return {
+        "backend": run.backend,
+        "strategy": run.strategy.name,
+        "mode": str(mode),
+        "workers": workers,
+        "operations": operations,
+        "errors": errors,
+        "elapsed": elapsed,
+        "ops_per_second": operations / elapsed if elapsed > 0 else 0.0,
+        # only successful increments are expected to show up in the counter
+        "expected": operations,
+        "actual": actual,
+        "lost": operations - actual,
+        **latency_stats(histogram).model_dump(exclude={"count"}),
+    }
+
+
+def write_json(results: list[dict], path: str):
+    with pathlib.Path(path).open("w") as f:
+        json.dump(results, f, indent=2)
+    logger.info(f"Results written to {path}")
+
+
+def write_csv(results: list[dict], path: str):
+    with pathlib.Path(path).open("w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=RESULT_FIELDS, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(results)
+    logger.info(f"Results written to {path}")
+
+
+def log_summary(results: list[dict]):
+    logger.info("=" * 100)
+    logger.info(
+        f"{'backend':<16} {'strategy':<10} {'mode':<10} {'workers':>7} {'ops/s':>10} "
+        f"{'p50 ms':>8} {'p99 ms':>8} {'max ms':>8} {'lost':>7} {'errors':>7}"
+    )
+    for r in results:
+        logger.info(
+            f"{r['backend']:<16} {r['strategy']:<10} {r['mode']:<10} {r['workers']:>7} "
+            f"{r['ops_per_second']:>10.1f} {r['p50_ms']:>8.2f} {r['p99_ms']:>8.2f} "
+            f"{r['max_ms']:>8.2f} {r['lost']:>7} {r['errors']:>7}"
+        )
+    logger.info("=" * 100)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--config", default="client/benchmark_matrix.yaml")
+    parser.add_argument("--json", dest="json_path", help="Write results as JSON")
+    parser.add_argument("--csv", dest="csv_path", help="Write results as CSV")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    config = BenchmarkConfig.from_yaml(args.config)
+
+    results = []
+    for run in config.runs():
+        result = run_benchmark(run)
+        if result is not None:
+            results.append(result)
+    log_summary(results)
+
+    if args.json_path:
+        write_json(results, args.json_path)
+    if args.csv_path:
+        write_csv(results, args.csv_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,40 @@
 from pydantic import BaseModel
 
 
+class LatencyStats(BaseModel):
+    count: int = 0
+    mean_ms: float = 0.0
+    p50_ms: float = 0.0
+    p90_ms: float = 0.0
+    p99_ms: float = 0.0
+    p999_ms: float = 0.0
+    max_ms: float = 0.0
+
+
 class StatsResponse(BaseModel):
     total_requests: int
     duration_seconds: float
     avg_rps: float
     min_rps: int
     max_rps: int
+    latency: LatencyStats = LatencyStats()
+
+
+class LatencyResponse(BaseModel):
+    # end-to-end latency per "METHOD /path"
+    endpoints: dict[str, LatencyStats]
+    # storage call latency per backend and operation
+    storage: dict[str, dict[str, LatencyStats]]
+
+
+class StorageState(BaseModel):
+    # backend serving /inc and /count
+    active: str
+    # initialized backends in this worker, switching to them is instant
+    warm: list[str]
+
+
+class StorageSwitch(BaseModel):
+    storage: str
+    # keep the previous backend initialized, for switching back and forth
+    keep_warm: bool = True
@@ -0,0 +1,45 @@
+from collections import defaultdict
+
+from domain.stats import LatencyResponse
+from middleware.request_tracker import latency_stats
+from utils.histogram import LatencyHistogram
+
+
+class LatencyTracker:
+    """Aggregates latency histograms per endpoint and per storage backend."""
+
+    def __init__(self):
+        self._endpoints: dict[str, LatencyHistogram] = defaultdict(LatencyHistogram)
+        self._storage: dict[str, dict[str, LatencyHistogram]] = defaultdict(
+            lambda: defaultdict(LatencyHistogram)
+        )
+
+    def record_request(self, endpoint: str, seconds: float) -> None:
+        """Record end-to-end latency of a request."""
+        self._endpoints[endpoint].record(int(seconds * 1_000_000))
+
+    def record_storage(self, backend: str, operation: str, seconds: float) -> None:
+        """Record latency of a single storage call."""
+        self._storage[backend][operation].record(int(seconds * 1_000_000))
+
+    def merge(self, other: "LatencyTracker") -> None:
+        for endpoint, histogram in other._endpoints.items():
+            self._endpoints[endpoint].merge(histogram)
+        for backend, operations in other._storage.items():
+            for operation, histogram in operations.items():
+                self._storage[backend][operation].merge(histogram)
+
+    def get_stats(self) -> LatencyResponse:
+        return LatencyResponse(
+            endpoints={
+                endpoint: latency_stats(histogram)
+                for endpoint, histogram in self._endpoints.items()
+            },
+            storage={
+                backend: {
+                    operation: latency_stats(histogram)
+                    for operation, histogram in operations.items()
+                }
+                for backend, operations in self._storage.items()
+            },
+        )
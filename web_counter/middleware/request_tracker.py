@@ -1,62 +1,124 @@
-import asyncio
-from collections import defaultdict
-import statistics
 import time
 
-from domain.stats import StatsResponse
+from domain.stats import LatencyStats, StatsResponse
+from utils.histogram import LatencyHistogram
+
+
+# seconds of per-second RPS history kept for min/avg/max
+DEFAULT_WINDOW_SECONDS = 3600
+
+
+def latency_stats(histogram: LatencyHistogram) -> LatencyStats:
+    """Convert a histogram of microsecond latencies into a LatencyStats model."""
+
+    def to_ms(value: float) -> float:
+        return round(value / 1000, 3)
+
+    return LatencyStats(
+        count=histogram.count,
+        mean_ms=to_ms(histogram.mean()),
+        p50_ms=to_ms(histogram.percentile(50)),
+        p90_ms=to_ms(histogram.percentile(90)),
+        p99_ms=to_ms(histogram.percentile(99)),
+        p999_ms=to_ms(histogram.percentile(99.9)),
+        max_ms=to_ms(histogram.max),
+    )
 
 
 class RequestTracker:
-    """Tracks request timestamps to calculate RPS."""
+    """Tracks per-second request counts and latencies to calculate RPS.
+
+    Counts live in a fixed ring buffer of `window_seconds` slots, so memory
+    stays constant no matter how long the server runs. `record` is O(1) and
+    never awaits, so it needs no lock on the event loop.
+    """
+
+    def __init__(self, window_seconds: int = DEFAULT_WINDOW_SECONDS):
+        self._window = window_seconds
+        self._bucket_seconds = [-1] * window_seconds
+        self._bucket_counts = [0] * window_seconds
+        self._latency = LatencyHistogram()
+        self._total_requests = 0
+        self._first_timestamp = None
+        self._last_timestamp = None
+
+    def record(self, latency_seconds: float = 0.0) -> None:
+        """Record a finished request and how long it took."""
+        now = time.time()
+        if self._first_timestamp is None:
+            self._first_timestamp = now
+        self._last_timestamp = now
+        self._total_requests += 1
 
-    def __init__(self):
-        self._timestamps = []
-        self._lock = asyncio.Lock()
+        second = int(now)
+        slot = second % self._window
+        if self._bucket_seconds[slot] != second:
+            self._bucket_seconds[slot] = second
+            self._bucket_counts[slot] = 0
+        self._bucket_counts[slot] += 1
 
-    async def record(self) -> None:
-        """Record a request timestamp."""
-        async with self._lock:
-            self._timestamps.append(time.time())
+        self._latency.record(int(latency_seconds * 1_000_000))
+
+    def merge(self, other: "RequestTracker") -> None:
+        """Add the requests of another tracker with the same window, e.g. a worker's"""
+        if other._first_timestamp is None:
+            return
+        if self._first_timestamp is None:
+            self._first_timestamp = other._first_timestamp
+            self._last_timestamp = other._last_timestamp
+        else:
+            self._first_timestamp = min(self._first_timestamp, other._first_timestamp)
+            self._last_timestamp = max(self._last_timestamp, other._last_timestamp)
+        self._total_requests += other._total_requests
+
+        # a slot holds whichever second was recorded last, keep the newer one
+        for slot in range(self._window):
+            second, count = other._bucket_seconds[slot], other._bucket_counts[slot]
+            if second > self._bucket_seconds[slot]:
+                self._bucket_seconds[slot] = second
+                self._bucket_counts[slot] = count
+            elif second == self._bucket_seconds[slot]:
+                self._bucket_counts[slot] += count
+
+        self._latency.merge(other._latency)
 
     async def get_stats(self) -> StatsResponse:
         """Calculate RPS statistics."""
-        async with self._lock:
-            if not self._timestamps:
-                return StatsResponse(
-                    total_requests=0,
-                    duration_seconds=0.0,
-                    avg_rps=0.0,
-                    min_rps=0,
-                    max_rps=0,
-                )
-
-            total_requests = len(self._timestamps)
-            start_time = self._timestamps[0]
-            end_time = self._timestamps[-1]
-            duration = end_time - start_time
-
-            if duration == 0:
-                return StatsResponse(
-                    total_requests=total_requests,
-                    duration_seconds=0.0,
-                    avg_rps=0.0,
-                    min_rps=0,
-                    max_rps=0,
-                )
-
-            # Calculate RPS per second bucket
-            buckets = defaultdict(int)
-            for ts in self._timestamps:
-                bucket = int(ts - start_time)
-                buckets[bucket] += 1
-
-            rps_values = list(buckets.values()) if buckets else [0]
-            avg_rps = statistics.mean(buckets.values())
+        if self._first_timestamp is None:
+            return StatsResponse(
+                total_requests=0,
+                duration_seconds=0.0,
+                avg_rps=0.0,
+                min_rps=0,
+                max_rps=0,
+            )
+
+        duration = self._last_timestamp - self._first_timestamp
+        latency = latency_stats(self._latency)
 
+        if duration == 0:
             return StatsResponse(
-                total_requests=total_requests,
-                duration_seconds=round(duration, 2),
-                avg_rps=round(avg_rps, 2),
-                min_rps=min(rps_values),
-                max_rps=max(rps_values),
+                total_requests=self._total_requests,
+                duration_seconds=0.0,
+                avg_rps=0.0,
+                min_rps=0,
+                max_rps=0,
+                latency=latency,
             )
+
+        # Only seconds still inside the window and inside the run count
+        oldest = int(self._last_timestamp) - self._window
+        rps_values = [
+            count
+            for second, count in zip(self._bucket_seconds, self._bucket_counts)
+            if second > oldest and count > 0
+        ] or [0]
+
+        return StatsResponse(
+            total_requests=self._total_requests,
+            duration_seconds=round(duration, 2),
+            avg_rps=round(sum(rps_values) / len(rps_values), 2),
+            min_rps=min(rps_values),
+            max_rps=max(rps_values),
+            latency=latency,
+        )
@@ -0,0 +1,127 @@
+"""Trackers for running the API with several worker processes.
+
+Every worker records into its own files under the shared directory, so
+recording stays lock-free. Stats requests can land on any worker, which then
+merges the files of all workers, including ones that were restarted.
+"""
+
+import os
+import pathlib
+import urllib.parse
+
+from domain.stats import LatencyResponse, StatsResponse
+from middleware.latency_tracker import LatencyTracker
+from middleware.request_tracker import DEFAULT_WINDOW_SECONDS, RequestTracker
+from utils.histogram import SharedLatencyHistogram
+from utils.shared_memory import SharedInt, SharedTimestamp, map_ints
+
+
+HEADER_CELLS = 3
+
+
+def _workers(directory: pathlib.Path) -> list[str]:
+    if not directory.exists():
+        return []
+    return sorted(path.name for path in directory.iterdir() if path.is_dir())
+
+
+class SharedHistograms(dict):
+    """Histograms by name, each one in its own file under `directory`"""
+
+    def __init__(self, directory: pathlib.Path):
+        super().__init__()
+        self._directory = directory
+
+    def __missing__(self, name: str) -> SharedLatencyHistogram:
+        histogram = SharedLatencyHistogram(
+            self._directory / urllib.parse.quote(name, safe="")
+        )
+        self[name] = histogram
+        return histogram
+
+    def load(self) -> None:
+        """Map the histograms the owning worker has created so far"""
+        if self._directory.exists():
+            for path in self._directory.iterdir():
+                name = urllib.parse.unquote(path.name)
+                if name not in self:
+                    self.__missing__(name)
+
+
+class SharedHistogramGroups(dict):
+    """SharedHistograms by group name, one directory per group"""
+
+    def __init__(self, directory: pathlib.Path):
+        super().__init__()
+        self._directory = directory
+
+    def __missing__(self, name: str) -> SharedHistograms:
+        group = SharedHistograms(self._directory / urllib.parse.quote(name, safe=""))
+        self[name] = group
+        return group
+
+    def load(self) -> None:
+        if self._directory.exists():
+            for path in self._directory.iterdir():
+                self[urllib.parse.unquote(path.name)].load()
+
+
+class SharedRequestTracker(RequestTracker):
+    """RequestTracker of one worker, get_stats reports for all of them"""
+
+    _total_requests = SharedInt(0)
+    _first_timestamp = SharedTimestamp(1)
+    _last_timestamp = SharedTimestamp(2)
+
+    def __init__(
+        self,
+        directory: pathlib.Path,
+        worker: str | None = None,
+        window_seconds: int = DEFAULT_WINDOW_SECONDS,
+    ):
+        self._directory = directory
+        self._worker = worker or str(os.getpid())
+        self._window = window_seconds
+        worker_dir = directory / self._worker
+        self._cells = map_ints(
+            worker_dir / "requests", HEADER_CELLS + 2 * window_seconds
+        )
+        # a zeroed slot reads as second 0, which is never inside the window
+        self._bucket_seconds = self._cells[HEADER_CELLS : HEADER_CELLS + window_seconds]
+        self._bucket_counts = self._cells[HEADER_CELLS + window_seconds :]
+        self._latency = SharedLatencyHistogram(worker_dir / "requests_latency")
+        self._peers: dict[str, SharedRequestTracker] = {self._worker: self}
+
+    async def get_stats(self) -> StatsResponse:
+        total = RequestTracker(self._window)
+        for worker in _workers(self._directory):
+            if worker not in self._peers:
+                self._peers[worker] = SharedRequestTracker(
+                    self._directory, worker, self._window
+                )
+            total.merge(self._peers[worker])
+        return await total.get_stats()
+
+
+class SharedLatencyTracker(LatencyTracker):
+    """LatencyTracker of one worker, get_stats reports for all of them"""
+
+    def __init__(self, directory: pathlib.Path, worker: str | None = None):
+        self._directory = directory
+        self._worker = worker or str(os.getpid())
+        worker_dir = directory / self._worker
+        self._endpoints = SharedHistograms(worker_dir / "endpoints")
+        self._storage = SharedHistogramGroups(worker_dir / "storage")
+        self._peers: dict[str, SharedLatencyTracker] = {self._worker: self}
+
+    def get_stats(self) -> LatencyResponse:
+        total = LatencyTracker()
+        for worker in _workers(self._directory):
+            if worker not in self._peers:
+                self._peers[worker] = SharedLatencyTracker(self._directory, worker)
+            peer = self._peers[worker]
+            # other workers may have added endpoints or backends since
+            peer._endpoints.load()
+            peer._storage.load()
+            total.merge(peer)
+        return total.get_stats()
@@ -0,0 +1,76 @@
+"""Run the API with several uvicorn workers that share counters and stats.
+
+Each run gets a fresh shared memory directory, the `shared_memory` storage and
+the /stats trackers of all workers live there. It is removed on shutdown.
+
+The storages picked by the environment are reset here, once, so workers only
+initialize them and never wipe what the others counted.
+
+Usage:
+    python serve.py --workers 4 --port 8000
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import shutil
+import sys
+
+from storage.factory import get_storage
+from storage.registry import check_storage_name, storage_names_from_env
+from utils.shared_memory import SHARED_DIR_ENV, create_shared_dir
+import uvicorn
+
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - web_counter - %(name)s - [%(filename)s:%(lineno)d] - %(levelname)s - %(message)s",
+    handlers=[logging.StreamHandler(sys.stdout)],
+)
+
+logger = logging.getLogger(__name__)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    return parser.parse_args()
+
+
+async def reset_storages(names: list[str]) -> None:
+    for name in names:
+        storage = get_storage(storage_type=name)
+        await storage.initialize()
+        try:
+            await storage.reset()
+        finally:
+            await storage.close()
+
+
+def main():
+    args = parse_args()
+    name, warm = storage_names_from_env()
+    names = list(dict.fromkeys([name, *warm]))
+    try:
+        for storage_name in names:
+            check_storage_name(storage_name, shared=True)
+    except ValueError as e:
+        sys.exit(str(e))
+
+    directory = create_shared_dir()
+    # uvicorn workers inherit the environment
+    os.environ[SHARED_DIR_ENV] = str(directory)
+    logger.info(f"Starting {args.workers} workers, shared state in {directory}")
+
+    try:
+        asyncio.run(reset_storages(names))
+        uvicorn.run("app:app", host=args.host, port=args.port, workers=args.workers)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,19 +2,35 @@ import asyncio
 
 import hazelcast
 from storage.storage import CounterStorage
+from utils.futures import wrap_hazelcast_future
 from utils.singletone import singleton
 
 
 @singleton
 class AtomicLongStorage(CounterStorage):
     def __init__(self):
-        self.client = hazelcast.HazelcastClient(cluster_name="storage")
+        self.client = None
+        self.counter = None
+
+    async def initialize(self):
+        """Connect to the cluster, the client constructor blocks until connected"""
+        self.client = await asyncio.to_thread(
+            hazelcast.HazelcastClient, cluster_name="storage"
+        )
         self.counter = self.client.cp_subsystem.get_atomic_long("counter")
 
     async def increment(self) -> int:
         """Async increment"""
-        return await asyncio.to_thread(self.counter.increment_and_get().result)
+        return await wrap_hazelcast_future(self.counter.increment_and_get())
+
+    async def increment_by(self, amount: int) -> int:
+        """Async add"""
+        return await wrap_hazelcast_future(self.counter.add_and_get(amount))
 
     async def get_count(self) -> int:
         """Async get count"""
-        return await asyncio.to_thread(self.counter.get().result)
+        return await wrap_hazelcast_future(self.counter.get())
+
+    async def close(self):
+        if self.client:
+            await asyncio.to_thread(self.client.shutdown)
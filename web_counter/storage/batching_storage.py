@@ -0,0 +1,134 @@
+import asyncio
+import contextlib
+from dataclasses import dataclass
+from enum import StrEnum
+import logging
+
+from storage.storage import CounterStorage
+
+
+logger = logging.getLogger(__name__)
+
+
+class DurabilityMode(StrEnum):
+    # increment returns as soon as it is buffered, value is an estimate
+    ASYNC = "async"
+    # increment waits until its batch is written to the backend, the value is
+    # exact only if the backend's increment_by returns the new total: cassandra
+    # returns 0 and sharded backends the shard's value
+    SYNC = "sync"
+
+
+@dataclass
+class BatchConfig:
+    flush_interval: float = 0.05
+    max_batch_size: int = 1000
+    durability: DurabilityMode = DurabilityMode.SYNC
+
+
+class BatchingStorage(CounterStorage):
+    """Write-behind wrapper that coalesces increments into one backend write.
+
+    Increments are accumulated in memory and flushed as a single
+    `increment_by(n)` call every `flush_interval` seconds, or earlier once
+    `max_batch_size` increments are pending.
+    """
+
+    def __init__(self, storage: CounterStorage, config: BatchConfig | None = None):
+        self._storage = storage
+        self._config = config or BatchConfig()
+        self._pending = 0
+        # batch being written by the current flush
+        self._inflight = 0
+        self._waiters: list[tuple[asyncio.Future, int]] = []
+        self._last_value = 0
+        self._flush_lock = asyncio.Lock()
+        self._flush_needed = asyncio.Event()
+        self._flush_task: asyncio.Task | None = None
+        self._closing = False
+
+    @property
+    def pending_count(self) -> int:
+        """Increments accepted but not yet written to the backend."""
+        return self._pending + self._inflight
+
+    async def initialize(self):
+        await self._storage.initialize()
+        self._last_value = await self._storage.get_count()
+        self._closing = False
+        self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def reset(self):
+        await self.flush()
+        await self._storage.reset()
+        self._last_value = await self._storage.get_count()
+
+    async def close(self):
+        if self._flush_task:
+            # not cancelled, that could drop the batch of a running flush
+            self._closing = True
+            self._flush_needed.set()
+            await self._flush_task
+            self._flush_task = None
+        await self.flush()
+        await self._storage.close()
+
+    async def increment(self) -> int:
+        return await self.increment_by(1)
+
+    async def increment_by(self, amount: int) -> int:
+        self._pending += amount
+        if self._pending >= self._config.max_batch_size:
+            self._flush_needed.set()
+
+        if self._config.durability == DurabilityMode.ASYNC:
+            return self._last_value + self._pending
+
+        waiter = asyncio.get_running_loop().create_future()
+        # remember the position inside the batch to hand out distinct values
+        self._waiters.append((waiter, self._pending))
+        return await waiter
+
+    async def get_count(self) -> int:
+        # no batch is half written while the flush lock is held, so the backend
+        # value and the pending increments don't overlap or miss a batch
+        async with self._flush_lock:
+            return await self._storage.get_count() + self._pending
+
+    async def flush(self) -> None:
+        """Write all pending increments to the backend in one call."""
+        async with self._flush_lock:
+            amount, self._pending = self._pending, 0
+            waiters, self._waiters = self._waiters, []
+            if amount == 0:
+                return
+
+            self._inflight = amount
+            try:
+                new_value = await self._storage.increment_by(amount)
+            except Exception as e:
+                logger.exception(f"Failed to flush batch of {amount} increments")
+                if waiters:
+                    for waiter, _ in waiters:
+                        if not waiter.done():
+                            waiter.set_exception(e)
+                else:
+                    # nobody is waiting for this batch, keep it for the next flush
+                    self._pending += amount
+                return
+            finally:
+                self._inflight = 0
+
+            self._last_value = new_value
+            base_value = new_value - amount
+            for waiter, position in waiters:
+                if not waiter.done():
+                    waiter.set_result(base_value + position)
+
+    async def _flush_loop(self) -> None:
+        while not self._closing:
+            with contextlib.suppress(TimeoutError):
+                async with asyncio.timeout(self._config.flush_interval):
+                    await self._flush_needed.wait()
+            self._flush_needed.clear()
+            await self.flush()
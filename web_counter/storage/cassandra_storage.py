@@ -2,33 +2,54 @@ import asyncio
 
 from cassandra.cluster import Cluster
 from cassandra import ConsistencyLevel
-from cassandra.query import SimpleStatement
+from storage.sharding import ShardMode, ShardPicker
 from storage.storage import CounterStorage
+from utils.futures import wrap_cassandra_future
+from utils.prepared_statements import PreparedStatementRegistry
 from utils.singletone import singleton
 
 
+INCREMENT_QUERY = "UPDATE counter SET count = count + 1 WHERE id = ?"
+INCREMENT_BY_QUERY = "UPDATE counter SET count = count + ? WHERE id = ?"
+GET_COUNT_QUERY = "SELECT count FROM counter WHERE id = ?"
+GET_SHARDS_COUNT_QUERY = "SELECT count FROM counter WHERE id IN ?"
+
+
 @singleton
 class CassandraStorage(CounterStorage):
-    def __init__(self):
+    def __init__(self, shards: int = 1, shard_mode: ShardMode = ShardMode.RANDOM):
         self.cluster = None
         self.session = None
+        self.statements = None
+        self._shards = ShardPicker(shards, shard_mode)
+        self._shard_ids = [f"counter:{shard}" for shard in range(shards)]
+
+    def _row_id(self) -> str:
+        if self._shards.enabled:
+            return self._shard_ids[self._shards.pick()]
+        return "counter"
+
+    async def _execute(self, query, parameters=None) -> list:
+        """Run a query through execute_async without blocking the event loop"""
+        return await wrap_cassandra_future(
+            self.session.execute_async(query, parameters)
+        )
 
     async def initialize(self):
         self.cluster = Cluster(["localhost"], port=9042)
+        # topology discovery is blocking, but it only happens once
         self.session = await asyncio.to_thread(self.cluster.connect)
 
-        await asyncio.to_thread(
-            self.session.execute,
+        await self._execute(
             """
             CREATE KEYSPACE IF NOT EXISTS web_counter
             WITH replication = {'class': 'SimpleStrategy', 'replication_factor': 3}
             """,
         )
 
-        await asyncio.to_thread(self.session.execute, "USE web_counter")
+        await self._execute("USE web_counter")
 
-        await asyncio.to_thread(
-            self.session.execute,
+        await self._execute(
             """
             CREATE TABLE IF NOT EXISTS counter (
                 id TEXT PRIMARY KEY,
@@ -37,28 +58,38 @@ class CassandraStorage(CounterStorage):
             """,
         )
 
-        await asyncio.to_thread(self.session.execute, "TRUNCATE counter")
+        # prepare hot-path statements up front so the first requests don't pay for it
+        self.statements = PreparedStatementRegistry(self.session)
+        await self.statements.prepare(INCREMENT_QUERY, ConsistencyLevel.QUORUM)
+        await self.statements.prepare(INCREMENT_BY_QUERY, ConsistencyLevel.QUORUM)
+        await self.statements.prepare(GET_COUNT_QUERY)
+        await self.statements.prepare(GET_SHARDS_COUNT_QUERY)
+
+    async def reset(self):
+        await self._execute("TRUNCATE counter")
 
     async def increment(self) -> int:
-        stmt = SimpleStatement(
-            "UPDATE counter SET count = count + 1 WHERE id = 'counter'",
-            consistency_level=ConsistencyLevel.QUORUM,
-        )
-        await asyncio.to_thread(
-            self.session.execute,
-            stmt,
+        await self.statements.execute(
+            INCREMENT_QUERY, (self._row_id(),), ConsistencyLevel.QUORUM
         )
         # just to speed up things
         return 0
 
-    async def get_count(self) -> int:
-        row = await asyncio.to_thread(
-            self.session.execute,
-            "SELECT count FROM counter WHERE id = 'counter'",
+    async def increment_by(self, amount: int) -> int:
+        await self.statements.execute(
+            INCREMENT_BY_QUERY, (amount, self._row_id()), ConsistencyLevel.QUORUM
         )
-        result = row.one()
-        print(result)
-        return result.count if result else 0
+        return 0
+
+    async def get_count(self) -> int:
+        if self._shards.enabled:
+            rows = await self.statements.execute(
+                GET_SHARDS_COUNT_QUERY, (self._shard_ids,)
+            )
+            return sum(row.count for row in rows)
+
+        rows = await self.statements.execute(GET_COUNT_QUERY, ("counter",))
+        return rows[0].count if rows else 0
 
     async def close(self):
         if self.cluster:
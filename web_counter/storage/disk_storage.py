@@ -17,6 +17,9 @@ class DiskStorage(CounterStorage):
                 await f.write("0")
 
     async def increment(self) -> int:
+        return await self.increment_by(1)
+
+    async def increment_by(self, amount: int) -> int:
         async with self._lock:
             await self._ensure_file_exists()
 
@@ -24,7 +27,7 @@ class DiskStorage(CounterStorage):
             async with aiofiles.open(self._file_path) as f:
                 count = int(await f.read())
 
-            count += 1
+            count += amount
 
             # Write atomically (temp + rename)
             temp = f"{self._file_path}.tmp"
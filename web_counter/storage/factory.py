@@ -1,4 +1,6 @@
+from middleware.latency_tracker import LatencyTracker
 from storage.atomic_long import AtomicLongStorage
+from storage.batching_storage import BatchConfig, BatchingStorage
 from storage.cassandra_storage import CassandraStorage
 from storage.disk_storage import DiskStorage
 from storage.inmemory_storage import InMemoryStorage
@@ -6,21 +8,64 @@ from storage.mongo import MongoDbStorage
 from storage.postgres import PostgresStorage
 from storage.neo4j import Neo4jStorage
 from storage.mongo_cluster import MongoClusterStorage
+from storage.sharding import ShardMode
+from storage.shared_memory_storage import SharedMemoryStorage
+from storage.storage import CounterStorage
+from storage.timed_storage import TimedStorage
+from storage.wal_storage import WalDiskStorage
 
 
-def get_storage(storage_type: str):
+STORAGE_TYPES = (
+    "inmemory",
+    "shared_memory",
+    "disk",
+    "disk_wal",
+    "postgres",
+    "hazelcast",
+    "mongodb",
+    "mongodb_cluster",
+    "cassandra",
+    "neo4j",
+)
+# state that a single process owns, several processes would not share one counter
+PROCESS_LOCAL_BACKENDS = ("inmemory", "disk_wal")
+
+
+def get_storage(
+    storage_type: str,
+    batch_config: BatchConfig | None = None,
+    shards: int = 1,
+    shard_mode: ShardMode = ShardMode.RANDOM,
+    latency_tracker: LatencyTracker | None = None,
+):
+    storage = _create_storage(storage_type, shards, shard_mode)
+    # time the real backend calls, not the time spent waiting for a batch
+    if latency_tracker is not None:
+        storage = TimedStorage(storage, storage_type, latency_tracker)
+    if batch_config is not None:
+        return BatchingStorage(storage, batch_config)
+    return storage
+
+
+def _create_storage(
+    storage_type: str, shards: int, shard_mode: ShardMode
+) -> CounterStorage:
     if storage_type == "disk":
         return DiskStorage()
+    elif storage_type == "disk_wal":
+        return WalDiskStorage()
     elif storage_type == "postgres":
-        return PostgresStorage()
+        return PostgresStorage(shards=shards, shard_mode=shard_mode)
     elif storage_type == "hazelcast":
         return AtomicLongStorage()
     elif storage_type == "mongodb":
-        return MongoDbStorage()
+        return MongoDbStorage(shards=shards, shard_mode=shard_mode)
     elif storage_type == "cassandra":
-        return CassandraStorage()
+        return CassandraStorage(shards=shards, shard_mode=shard_mode)
     elif storage_type == "neo4j":
-        return Neo4jStorage()
+        return Neo4jStorage(shards=shards, shard_mode=shard_mode)
     elif storage_type == "mongodb_cluster":
-        return MongoClusterStorage()
+        return MongoClusterStorage(shards=shards, shard_mode=shard_mode)
+    elif storage_type == "shared_memory":
+        return SharedMemoryStorage()
     return InMemoryStorage()
@@ -17,6 +17,11 @@ class InMemoryStorage(CounterStorage):
             self._count += 1
             return self._count
 
+    async def increment_by(self, amount: int) -> int:
+        async with self._lock:
+            self._count += amount
+            return self._count
+
     async def get_count(self) -> int:
         async with self._lock:
             return self._count
@@ -2,15 +2,18 @@ import asyncio
 
 from motor.motor_asyncio import AsyncIOMotorClient
 from pymongo import ReturnDocument, WriteConcern
+from storage.sharding import ShardMode, ShardPicker
 from storage.storage import CounterStorage
 from utils.singletone import singleton
 
 
 @singleton
 class MongoDbStorage(CounterStorage):
-    def __init__(self):
+    def __init__(self, shards: int = 1, shard_mode: ShardMode = ShardMode.RANDOM):
         self.client = None
         self.collection = None
+        self._shards = ShardPicker(shards, shard_mode)
+        self._shard_ids = [f"counter:{shard}" for shard in range(shards)]
 
     async def initialize(self):
         self.client = AsyncIOMotorClient("mongodb://localhost:27017")
@@ -23,14 +26,35 @@ class MongoDbStorage(CounterStorage):
             await self.collection.insert_one({"_id": "counter", "count": 0})
 
     async def increment(self) -> int:
+        return await self.increment_by(1)
+
+    async def increment_by(self, amount: int) -> int:
+        if self._shards.enabled:
+            # returns the value of the updated shard, not the total
+            result = await self.collection.find_one_and_update(
+                {"_id": self._shard_ids[self._shards.pick()]},
+                {"$inc": {"count": amount}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+            return result["count"]
+
         result = await self.collection.find_one_and_update(
             {"_id": "counter"},
-            {"$inc": {"count": 1}},
+            {"$inc": {"count": amount}},
             return_document=ReturnDocument.AFTER,
         )
         return result["count"]
 
     async def get_count(self) -> int:
+        if self._shards.enabled:
+            cursor = self.collection.aggregate([
+                {"$match": {"_id": {"$in": self._shard_ids}}},
+                {"$group": {"_id": None, "count": {"$sum": "$count"}}},
+            ])
+            result = await cursor.to_list(length=1)
+            return result[0]["count"] if result else 0
+
         result = await self.collection.find_one({"_id": "counter"})
         return result["count"]
 
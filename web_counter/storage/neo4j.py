@@ -1,54 +1,99 @@
-import asyncio
-
-from neo4j import GraphDatabase
+from neo4j import AsyncGraphDatabase
+from storage.sharding import ShardMode, ShardPicker
 from storage.storage import CounterStorage
 from utils.singletone import singleton
 
 
 @singleton
 class Neo4jStorage(CounterStorage):
-    def __init__(self):
+    def __init__(self, shards: int = 1, shard_mode: ShardMode = ShardMode.RANDOM):
         self.driver = None
+        self._shards = ShardPicker(shards, shard_mode)
 
     async def initialize(self):
         uri = "bolt://localhost:7687"
         auth = ("neo4j", "password")
-        self.driver = GraphDatabase.driver(uri, auth=auth)
+        self.driver = AsyncGraphDatabase.driver(uri, auth=auth)
 
-        with self.driver.session() as s:
-            s.run(
+        async with self.driver.session() as s:
+            await s.run(
                 """
                 MERGE (c:Counter {name: 'default'})
                 ON CREATE SET c.value = 0
                 """
             )
+            if self._shards.enabled:
+                await s.run(
+                    """
+                    UNWIND range(0, $shards - 1) AS shard
+                    MERGE (c:CounterShard {name: 'default', shard: shard})
+                    ON CREATE SET c.value = 0
+                    """,
+                    shards=self._shards.shards,
+                )
 
     async def increment(self) -> int:
-        def _increment(tx):
-            result = tx.run(
+        return await self.increment_by(1)
+
+    async def increment_by(self, amount: int) -> int:
+        async def _increment(tx):
+            result = await tx.run(
                 """
                 MATCH (c:Counter {name: 'default'})
-                SET c.value = c.value + 1
+                SET c.value = c.value + $amount
                 RETURN c.value AS count
+                """,
+                amount=amount,
+            )
+            record = await result.single()
+            return record["count"]
+
+        async def _increment_shard(tx):
+            # returns the value of the updated shard, not the total
+            result = await tx.run(
                 """
+                MATCH (c:CounterShard {name: 'default', shard: $shard})
+                SET c.value = c.value + $amount
+                RETURN c.value AS count
+                """,
+                shard=self._shards.pick(),
+                amount=amount,
             )
-            return result.single()["count"]
+            record = await result.single()
+            return record["count"]
 
-        with self.driver.session() as s:
-            return s.execute_write(_increment)
+        async with self.driver.session() as s:
+            if self._shards.enabled:
+                return await s.execute_write(_increment_shard)
+            return await s.execute_write(_increment)
 
     async def get_count(self) -> int:
-        def _get(tx):
-            result = tx.run(
+        async def _get(tx):
+            result = await tx.run(
                 """
                 MATCH (c:Counter {name: 'default'})
                 RETURN c.value AS count
                 """
             )
-            return result.single()["count"]
+            record = await result.single()
+            return record["count"]
+
+        async def _get_shards(tx):
+            result = await tx.run(
+                """
+                MATCH (c:CounterShard {name: 'default'})
+                WHERE c.shard < $shards
+                RETURN sum(c.value) AS count
+                """,
+                shards=self._shards.shards,
+            )
+            record = await result.single()
+            return record["count"]
 
-        with self.driver.session() as s:
-            return s.execute_read(_get)
+        async with self.driver.session() as s:
+            if self._shards.enabled:
+                return await s.execute_read(_get_shards)
+            return await s.execute_read(_get)
 
     async def close(self):
-        self.driver.close()
+        await self.driver.close()
@@ -1,12 +1,17 @@
 from psycopg_pool import AsyncConnectionPool
+from storage.sharding import ShardMode, ShardPicker
 from storage.storage import CounterStorage
 from utils.singletone import singleton
 
 
+USER_ID = 1
+
+
 @singleton
 class PostgresStorage(CounterStorage):
-    def __init__(self):
+    def __init__(self, shards: int = 1, shard_mode: ShardMode = ShardMode.RANDOM):
         self.pool = None
+        self._shards = ShardPicker(shards, shard_mode)
 
     async def initialize(self):
         """Initialize connection pool"""
@@ -19,24 +24,53 @@ class PostgresStorage(CounterStorage):
 
     async def increment(self) -> int:
         """Async increment"""
+        return await self.increment_by(1)
+
+    async def increment_by(self, amount: int) -> int:
+        """Async increment by amount"""
+        if self._shards.enabled:
+            return await self._increment_shard(amount)
+
         async with self.pool.connection() as conn:
             async with conn.cursor() as cursor:
                 await cursor.execute(
-                    "UPDATE user_count SET count = count + 1 WHERE user_id = %s RETURNING count",
-                    (1,),
+                    "UPDATE user_count SET count = count + %s WHERE user_id = %s RETURNING count",
+                    (amount, USER_ID),
                 )
                 result = await cursor.fetchone()
                 return result[0]
 
-    async def get_count(self) -> int:
-        """Async get count"""
+    async def _increment_shard(self, amount: int) -> int:
+        """Increment one shard row, returns the value of that shard only"""
         async with self.pool.connection() as conn, conn.cursor() as cursor:
             await cursor.execute(
-                "SELECT count FROM user_count WHERE user_id = %s", (1,)
+                """
+                INSERT INTO user_count_shard (user_id, shard, count)
+                VALUES (%s, %s, %s)
+                ON CONFLICT (user_id, shard)
+                DO UPDATE SET count = user_count_shard.count + EXCLUDED.count
+                RETURNING count
+                """,
+                (USER_ID, self._shards.pick(), amount),
             )
             result = await cursor.fetchone()
             return result[0]
 
+    async def get_count(self) -> int:
+        """Async get count"""
+        async with self.pool.connection() as conn, conn.cursor() as cursor:
+            if self._shards.enabled:
+                await cursor.execute(
+                    "SELECT COALESCE(SUM(count), 0) FROM user_count_shard WHERE user_id = %s",
+                    (USER_ID,),
+                )
+            else:
+                await cursor.execute(
+                    "SELECT count FROM user_count WHERE user_id = %s", (USER_ID,)
+                )
+            result = await cursor.fetchone()
+            return result[0]
+
     async def close(self):
         """Close pool"""
         await self.pool.close()
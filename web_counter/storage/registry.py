@@ -0,0 +1,261 @@
+import asyncio
+from collections import Counter
+from collections.abc import AsyncGenerator
+from contextlib import asynccontextmanager
+from dataclasses import replace
+import logging
+import os
+import pathlib
+
+from middleware.latency_tracker import LatencyTracker
+from storage.batching_storage import BatchConfig, DurabilityMode
+from storage.factory import PROCESS_LOCAL_BACKENDS, STORAGE_TYPES, get_storage
+from storage.sharding import ShardMode
+from storage.storage import CounterStorage
+from utils.shared_memory import map_ints
+
+
+logger = logging.getLogger(__name__)
+
+# backend serving requests at startup
+STORAGE_ENV = "WEB_COUNTER_STORAGE"
+DEFAULT_STORAGE = "cassandra"
+# comma separated backends to initialize at startup, for switching without a cold start
+WARM_STORAGES_ENV = "WEB_COUNTER_WARM_STORAGES"
+# write-behind batching of every backend, off unless one of them is set
+BATCH_INTERVAL_ENV = "WEB_COUNTER_BATCH_INTERVAL"
+BATCH_SIZE_ENV = "WEB_COUNTER_BATCH_SIZE"
+BATCH_DURABILITY_ENV = "WEB_COUNTER_BATCH_DURABILITY"
+# sub-keys per counter for the backends that support sharding, 1 means unsharded
+SHARDS_ENV = "WEB_COUNTER_SHARDS"
+SHARD_MODE_ENV = "WEB_COUNTER_SHARD_MODE"
+
+
+class UnknownStorageError(ValueError):
+    """Name that isn't one of STORAGE_TYPES"""
+
+    def __init__(self, name: str):
+        super().__init__(
+            f"Unknown storage {name!r}, expected one of {', '.join(STORAGE_TYPES)}"
+        )
+
+
+class ProcessLocalStorageError(ValueError):
+    """Backend that several workers would each have their own copy of"""
+
+    def __init__(self, name: str):
+        super().__init__(
+            f"Storage {name} keeps its state in one process, workers can't share it"
+        )
+
+
+class ActiveStorageError(ValueError):
+    """Release of the storage that serves requests"""
+
+    def __init__(self, name: str):
+        super().__init__(f"Storage {name} is active, activate another one first")
+
+
+def storage_names_from_env() -> tuple[str, list[str]]:
+    """Backend to start with and the ones to keep warm"""
+    warm = os.environ.get(WARM_STORAGES_ENV, "")
+    return (
+        os.environ.get(STORAGE_ENV, DEFAULT_STORAGE),
+        [name.strip() for name in warm.split(",") if name.strip()],
+    )
+
+
+def batch_config_from_env() -> BatchConfig | None:
+    """Batching settings, BatchConfig defaults for the unset ones"""
+    interval = os.environ.get(BATCH_INTERVAL_ENV)
+    size = os.environ.get(BATCH_SIZE_ENV)
+    durability = os.environ.get(BATCH_DURABILITY_ENV)
+    if interval is None and size is None and durability is None:
+        return None
+
+    overrides = {}
+    if interval is not None:
+        overrides["flush_interval"] = float(interval)
+    if size is not None:
+        overrides["max_batch_size"] = int(size)
+    if durability is not None:
+        overrides["durability"] = DurabilityMode(durability)
+    return replace(BatchConfig(), **overrides)
+
+
+def shards_from_env() -> tuple[int, ShardMode]:
+    """Shard count and mode, unsharded by default"""
+    return (
+        int(os.environ.get(SHARDS_ENV, "1")),
+        ShardMode(os.environ.get(SHARD_MODE_ENV, ShardMode.RANDOM)),
+    )
+
+
+def check_storage_name(name: str, shared: bool = False) -> None:
+    """Raise if `name` can't be used, `shared` if several workers would use it"""
+    if name not in STORAGE_TYPES:
+        raise UnknownStorageError(name)
+    if shared and name in PROCESS_LOCAL_BACKENDS:
+        raise ProcessLocalStorageError(name)
+
+
+class StorageRegistry:
+    """Keeps initialized storages warm and knows which one serves requests.
+
+    Switching to a warm storage is just a pointer swap. Requests already
+    running on the old storage finish there, it stays open until released and
+    a release waits for them.
+
+    With a `shared_dir` the active backend is shared by all workers: a switch
+    bumps a generation number in shared memory, and every worker compares it on
+    its next request and follows. Backends that live in one process are
+    rejected there.
+
+    Every storage is wrapped in a BatchingStorage when `batch_config` is given,
+    and backends that support sharding spread increments over `shards` keys.
+    """
+
+    def __init__(
+        self,
+        latency_tracker: LatencyTracker | None = None,
+        shared_dir: pathlib.Path | None = None,
+        batch_config: BatchConfig | None = None,
+        shards: int = 1,
+        shard_mode: ShardMode = ShardMode.RANDOM,
+    ):
+        self._latency_tracker = latency_tracker
+        self._batch_config = batch_config
+        self._shards = shards
+        self._shard_mode = shard_mode
+        self._storages: dict[str, CounterStorage] = {}
+        self._active_name: str | None = None
+        self._active: CounterStorage | None = None
+        self._lock = asyncio.Lock()
+        # requests running on each storage, notified when one finishes
+        self._in_use: Counter[CounterStorage] = Counter()
+        self._request_done = asyncio.Condition()
+        self._name_file = None
+        self._generation_cells = None
+        self._generation = 0
+        if shared_dir is not None:
+            self._name_file = shared_dir / "active_storage"
+            self._generation_cells = map_ints(shared_dir / "storage_generation", 1)
+
+    @property
+    def active_name(self) -> str | None:
+        return self._active_name
+
+    @property
+    def warm(self) -> list[str]:
+        return list(self._storages)
+
+    @property
+    def shared(self) -> bool:
+        return self._name_file is not None
+
+    async def start(self, name: str, warm: list[str] | None = None) -> None:
+        """Initialize the `warm` storages and activate `name`
+
+        A single process starts the counters over. Under several workers the
+        first worker to start picks the backend and the others follow it, and
+        serve.py resets the counters once before starting them: a worker that
+        starts late would wipe what the others counted.
+        """
+        for warm_name in warm or []:
+            storage = await self.warm_up(warm_name)
+            if not self.shared:
+                await storage.reset()
+        if self.shared and self._name_file.exists():
+            await self._follow()
+        else:
+            await self.activate(name)
+            if not self.shared:
+                await self._active.reset()
+
+    async def warm_up(self, name: str) -> CounterStorage:
+        """Return the initialized storage `name`, creating it on first use"""
+        check_storage_name(name, shared=self.shared)
+        async with self._lock:
+            if name not in self._storages:
+                storage = get_storage(
+                    storage_type=name,
+                    batch_config=self._batch_config,
+                    shards=self._shards,
+                    shard_mode=self._shard_mode,
+                    latency_tracker=self._latency_tracker,
+                )
+                await storage.initialize()
+                self._storages[name] = storage
+                logger.info(f"Storage {name} initialized")
+            return self._storages[name]
+
+    async def activate(self, name: str) -> None:
+        """Route requests to `name`, initializing it first if it isn't warm"""
+        self._switch(name, await self.warm_up(name))
+        if self._name_file is not None:
+            self._name_file.write_text(name)
+            self._generation_cells[0] += 1
+            self._generation = self._generation_cells[0]
+
+    async def release(self, name: str) -> None:
+        """Close a warm storage that doesn't serve requests
+
+        Waits for the requests still running on it. Only this worker closes it,
+        other workers keep their own copy warm.
+        """
+        async with self._lock:
+            if name == self._active_name:
+                raise ActiveStorageError(name)
+            storage = self._storages.pop(name, None)
+            if storage is None:
+                return
+            async with self._request_done:
+                await self._request_done.wait_for(lambda: not self._in_use[storage])
+            del self._in_use[storage]
+            await storage.close()
+            logger.info(f"Storage {name} closed")
+
+    async def current(self) -> CounterStorage:
+        """Active storage, after following a switch made by another worker"""
+        if (
+            self._generation_cells is not None
+            and self._generation_cells[0] != self._generation
+        ):
+            await self._follow()
+        return self._active
+
+    @asynccontextmanager
+    async def use(self) -> AsyncGenerator[CounterStorage]:
+        """Storage for the current request, not closed before the request is done"""
+        storage = await self.current()
+        self._in_use[storage] += 1
+        try:
+            yield storage
+        finally:
+            self._in_use[storage] -= 1
+            async with self._request_done:
+                self._request_done.notify_all()
+
+    async def close(self) -> None:
+        async with self._lock:
+            for name, storage in self._storages.items():
+                await storage.close()
+                logger.info(f"Storage {name} closed")
+            self._storages.clear()
+            self._active_name = self._active = None
+
+    async def _follow(self) -> None:
+        """Activate the backend another worker switched to
+
+        Only initializes it, initialize never resets a counter.
+        """
+        generation = self._generation_cells[0]
+        name = self._name_file.read_text()
+        self._switch(name, await self.warm_up(name))
+        self._generation = generation
+
+    def _switch(self, name: str, storage: CounterStorage) -> None:
+        if name != self._active_name:
+            logger.info(f"Active storage: {self._active_name} -> {name}")
+        self._active_name = name
+        self._active = storage
@@ -0,0 +1,37 @@
+from enum import StrEnum
+import os
+import random
+
+
+class ShardMode(StrEnum):
+    # every increment picks a random shard
+    RANDOM = "random"
+    # every server process sticks to one shard
+    WORKER = "worker"
+
+
+class InvalidShardCountError(ValueError):
+    """Shard count below one"""
+
+    def __init__(self, shards: int):
+        super().__init__(f"Shard count must be positive, got {shards}")
+
+
+class ShardPicker:
+    """Chooses which counter shard an increment should go to."""
+
+    def __init__(self, shards: int = 1, mode: ShardMode = ShardMode.RANDOM):
+        if shards < 1:
+            raise InvalidShardCountError(shards)
+        self.shards = shards
+        self.mode = mode
+        self._worker_shard = os.getpid() % shards
+
+    @property
+    def enabled(self) -> bool:
+        return self.shards > 1
+
+    def pick(self) -> int:
+        if self.mode == ShardMode.WORKER:
+            return self._worker_shard
+        return random.randrange(self.shards)
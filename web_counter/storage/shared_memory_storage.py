@@ -0,0 +1,68 @@
+import fcntl
+import os
+import pathlib
+import shutil
+
+from storage.storage import CounterStorage
+from utils.shared_memory import create_shared_dir, map_ints, shared_dir
+from utils.singletone import singleton
+
+
+@singleton
+class SharedMemoryStorage(CounterStorage):
+    """In-memory counter that every worker process on the host shares.
+
+    The value is one int64 in a memory-mapped file. Increments take an exclusive
+    flock on the file, the critical section is a single add, so the lock is held
+    for microseconds and is taken without awaiting.
+
+    Without a `path` the counter lives in the serve.py run directory, or in a
+    temporary directory of its own that is removed on close when the API runs
+    as a single process.
+    """
+
+    def __init__(self, path: pathlib.Path | None = None) -> None:
+        self._path = path
+        self._temp_dir: pathlib.Path | None = None
+        self._cells: memoryview | None = None
+        self._lock_fd: int | None = None
+
+    async def initialize(self):
+        if self._path is None:
+            directory = shared_dir()
+            if directory is None:
+                directory = self._temp_dir = create_shared_dir()
+            self._path = directory / "counter"
+        self._cells = map_ints(self._path, 1)
+        self._lock_fd = os.open(self._path, os.O_RDWR)
+
+    async def close(self):
+        if self._cells is not None:
+            mapping = self._cells.obj
+            self._cells.release()
+            mapping.close()
+            self._cells = None
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)
+            self._lock_fd = None
+        if self._temp_dir is not None:
+            shutil.rmtree(self._temp_dir, ignore_errors=True)
+            self._temp_dir = self._path = None
+
+    def _add(self, amount: int) -> int:
+        fcntl.flock(self._lock_fd, fcntl.LOCK_EX)
+        try:
+            self._cells[0] += amount
+            return self._cells[0]
+        finally:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+
+    async def increment(self) -> int:
+        return self._add(1)
+
+    async def increment_by(self, amount: int) -> int:
+        return self._add(amount)
+
+    async def get_count(self) -> int:
+        # an aligned 8 byte read never sees a half-written value
+        return self._cells[0]
@@ -12,11 +12,23 @@ class CounterStorage(ABC):
         pass
         """Close the storage."""
 
+    async def reset(self):  # ruff: ignore[empty-method-without-abstract-decorator]
+        """Start the counter over, called once per run and never by initialize.
+
+        Backends that keep counting across runs leave their value as is.
+        """
+        pass
+
     @abstractmethod
     async def increment(self) -> int:
         """Increment the counter and return the new value."""
         pass
 
+    @abstractmethod
+    async def increment_by(self, amount: int) -> int:
+        """Increment the counter by `amount` and return the new value."""
+        pass
+
     @abstractmethod
     async def get_count(self) -> int:
         """Return the current counter value."""
@@ -0,0 +1,49 @@
+import time
+
+from middleware.latency_tracker import LatencyTracker
+from storage.storage import CounterStorage
+
+
+class TimedStorage(CounterStorage):
+    """Wrapper that reports the latency of every storage call to a LatencyTracker."""
+
+    def __init__(self, storage: CounterStorage, backend: str, tracker: LatencyTracker):
+        self._storage = storage
+        self._backend = backend
+        self._tracker = tracker
+
+    async def initialize(self):
+        await self._storage.initialize()
+
+    async def close(self):
+        await self._storage.close()
+
+    async def reset(self):
+        await self._storage.reset()
+
+    async def increment(self) -> int:
+        start = time.perf_counter()
+        try:
+            return await self._storage.increment()
+        finally:
+            self._tracker.record_storage(
+                self._backend, "increment", time.perf_counter() - start
+            )
+
+    async def increment_by(self, amount: int) -> int:
+        start = time.perf_counter()
+        try:
+            return await self._storage.increment_by(amount)
+        finally:
+            self._tracker.record_storage(
+                self._backend, "increment_by", time.perf_counter() - start
+            )
+
+    async def get_count(self) -> int:
+        start = time.perf_counter()
+        try:
+            return await self._storage.get_count()
+        finally:
+            self._tracker.record_storage(
+                self._backend, "get_count", time.perf_counter() - start
+            )
@@ -0,0 +1,254 @@
+import asyncio
+import fcntl
+import logging
+import os
+import pathlib
+import struct
+import zlib
+
+from storage.storage import CounterStorage
+
+
+logger = logging.getLogger(__name__)
+
+# amount and crc32 of the amount, a torn or corrupt record fails the check
+RECORD = struct.Struct("<qI")
+# WAL size after which the value is checkpointed and a new segment is started
+DEFAULT_CHECKPOINT_BYTES = 4 * 1024 * 1024
+# flushes the data and the file size, skips the mtime update fsync would add
+_sync = getattr(os, "fdatasync", os.fsync)
+
+
+class WalFailedError(RuntimeError):
+    """A WAL write or sync failed, nothing is written after that"""
+
+    def __init__(self):
+        super().__init__("WAL is unusable after a failed write")
+
+
+class WalNotRunningError(RuntimeError):
+    """Increment before initialize, after close or after the writer died"""
+
+    def __init__(self):
+        super().__init__("WAL writer is not running")
+
+
+def _crc(amount: int) -> int:
+    return zlib.crc32(amount.to_bytes(8, "little", signed=True))
+
+
+def _fsync_dir(directory: pathlib.Path) -> None:
+    """Make created, renamed and deleted entries of `directory` durable"""
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class WalDiskStorage(CounterStorage):
+    """Log-structured disk counter: append-only WAL with group commit.
+
+    Increments are appended to the WAL by a single writer task. One write and
+    one fdatasync cover every increment that arrived while the previous sync was
+    running, so durable throughput grows with concurrency instead of being
+    capped at one increment per fsync. File work runs in a thread, off the
+    event loop. An increment returns once its record is synced.
+
+    Every `checkpoint_bytes` of log the value is written to a checkpoint and the
+    log starts a new segment. Recovery loads the checkpoint and replays the
+    segments written after it.
+
+    Layout of `directory`:
+        checkpoint  "<value> <first segment not included in value>"
+        wal.<n>     records of segment n
+        lock        flock held by the owning process
+    """
+
+    def __init__(
+        self,
+        directory: str = "counter_wal",
+        checkpoint_bytes: int = DEFAULT_CHECKPOINT_BYTES,
+    ):
+        self._directory = pathlib.Path(directory)
+        self._checkpoint_bytes = checkpoint_bytes
+        # includes increments still waiting for their sync
+        self._count = 0
+        self._durable_count = 0
+        self._pending = 0
+        self._waiters: list[asyncio.Future] = []
+        self._commit_needed = asyncio.Event()
+        self._commit_task: asyncio.Task | None = None
+        self._closing = False
+        self._failure: Exception | None = None
+        self._segment = 0
+        self._wal_fd: int | None = None
+        self._wal_bytes = 0
+        self._lock_fd: int | None = None
+
+    async def initialize(self):
+        await asyncio.to_thread(self._recover)
+        self._closing = False
+        self._commit_task = asyncio.create_task(self._commit_loop())
+
+    async def close(self):
+        if self._commit_task:
+            self._closing = True
+            self._commit_needed.set()
+            await self._commit_task
+            self._commit_task = None
+        if self._wal_fd is not None:
+            if self._failure is None:
+                await asyncio.to_thread(self._checkpoint, self._durable_count)
+            os.close(self._wal_fd)
+            self._wal_fd = None
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)
+            self._lock_fd = None
+
+    async def increment(self) -> int:
+        return await self.increment_by(1)
+
+    async def increment_by(self, amount: int) -> int:
+        if self._failure is not None:
+            raise WalFailedError from self._failure
+        # nothing would ever resolve the waiter
+        if self._commit_task is None or self._commit_task.done():
+            raise WalNotRunningError
+
+        self._count += amount
+        value = self._count
+        waiter = asyncio.get_running_loop().create_future()
+        self._pending += amount
+        self._waiters.append(waiter)
+        self._commit_needed.set()
+
+        await waiter
+        return value
+
+    async def get_count(self) -> int:
+        return self._durable_count
+
+    async def _commit_loop(self) -> None:
+        while not self._closing and self._failure is None:
+            await self._commit_needed.wait()
+            self._commit_needed.clear()
+            await self._commit()
+        if self._failure is None:
+            await self._commit()
+
+    async def _commit(self) -> None:
+        """Append everything pending as one record and sync it"""
+        amount, self._pending = self._pending, 0
+        waiters, self._waiters = self._waiters, []
+        if not waiters:
+            return
+
+        try:
+            await asyncio.to_thread(self._append, amount)
+        except Exception as e:
+            logger.exception(f"Failed to commit {len(waiters)} increments to the WAL")
+            self._fail(e, waiters)
+            return
+
+        self._durable_count += amount
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+
+        if self._wal_bytes >= self._checkpoint_bytes:
+            try:
+                await asyncio.to_thread(self._checkpoint, self._durable_count)
+            except Exception as e:
+                logger.exception("Failed to checkpoint the WAL")
+                self._fail(e, [])
+
+    def _fail(self, error: Exception, waiters: list[asyncio.Future]) -> None:
+        """Stop writing and fail `waiters` and every increment still pending"""
+        # after a failed fsync the page cache can't be trusted
+        self._failure = error
+        waiters = [*waiters, *self._waiters]
+        self._pending, self._waiters = 0, []
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_exception(error)
+
+    def _segment_path(self, segment: int) -> pathlib.Path:
+        return self._directory / f"wal.{segment}"
+
+    def _segments(self) -> list[int]:
+        return sorted(int(path.suffix[1:]) for path in self._directory.glob("wal.*"))
+
+    def _append(self, amount: int) -> None:
+        os.write(self._wal_fd, RECORD.pack(amount, _crc(amount)))
+        _sync(self._wal_fd)
+        self._wal_bytes += RECORD.size
+
+    def _checkpoint(self, value: int) -> None:
+        """Persist `value` and continue the log in a new, empty segment"""
+        next_segment = self._segment + 1
+        wal_fd = os.open(
+            self._segment_path(next_segment), os.O_WRONLY | os.O_CREAT | os.O_APPEND
+        )
+
+        temp = self._directory / "checkpoint.tmp"
+        with temp.open("w") as f:
+            f.write(f"{value} {next_segment}")
+            f.flush()
+            os.fsync(f.fileno())
+        temp.replace(self._directory / "checkpoint")
+        _fsync_dir(self._directory)
+
+        if self._wal_fd is not None:
+            os.close(self._wal_fd)
+        self._wal_fd, self._segment, self._wal_bytes = wal_fd, next_segment, 0
+
+        # everything before next_segment is in the checkpoint now
+        for segment in self._segments():
+            if segment < next_segment:
+                self._segment_path(segment).unlink()
+
+    def _read_checkpoint(self) -> tuple[int, int]:
+        path = self._directory / "checkpoint"
+        if not path.exists():
+            return 0, 0
+        value, first_segment = path.read_text().split()
+        return int(value), int(first_segment)
+
+    def _replay(self, segment: int) -> int:
+        """Sum the amounts of a segment, up to its first torn or corrupt record"""
+        data = self._segment_path(segment).read_bytes()
+        total = 0
+        for offset in range(0, len(data) - RECORD.size + 1, RECORD.size):
+            amount, crc = RECORD.unpack_from(data, offset)
+            if crc != _crc(amount):
+                logger.warning(f"Corrupt record in wal.{segment} at byte {offset}")
+                return total
+            total += amount
+
+        if len(data) % RECORD.size:
+            logger.warning(f"Dropped torn record at the end of wal.{segment}")
+        return total
+
+    def _recover(self) -> None:
+        self._directory.mkdir(parents=True, exist_ok=True)
+        self._lock_fd = os.open(self._directory / "lock", os.O_RDWR | os.O_CREAT)
+        try:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(self._lock_fd)
+            self._lock_fd = None
+            message = f"{self._directory} is used by another process"
+            raise RuntimeError(message) from None
+
+        value, first_segment = self._read_checkpoint()
+        segments = [s for s in self._segments() if s >= first_segment]
+        for segment in segments:
+            value += self._replay(segment)
+
+        self._count = self._durable_count = value
+        self._failure = None
+        self._segment = max([first_segment, *segments])
+        # start over in a fresh segment, nothing is ever appended after a torn tail
+        self._checkpoint(value)
+        logger.info(f"Recovered counter {value} from {len(segments)} WAL segments")
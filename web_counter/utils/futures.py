@@ -0,0 +1,43 @@
+import asyncio
+
+
+def _set_result(future: asyncio.Future, result) -> None:
+    if not future.done():
+        future.set_result(result)
+
+
+def _set_exception(future: asyncio.Future, exception: BaseException) -> None:
+    if not future.done():
+        future.set_exception(exception)
+
+
+def wrap_cassandra_future(response_future) -> asyncio.Future:
+    """Bridge a cassandra-driver ResponseFuture to an asyncio future.
+
+    Driver callbacks run on the driver's event thread, so results are handed
+    over with call_soon_threadsafe. Resolves to the list of rows of the first page.
+    """
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+    response_future.add_callbacks(
+        callback=lambda rows: loop.call_soon_threadsafe(_set_result, future, rows),
+        errback=lambda exc: loop.call_soon_threadsafe(_set_exception, future, exc),
+    )
+    return future
+
+
+def wrap_hazelcast_future(hazelcast_future) -> asyncio.Future:
+    """Bridge a hazelcast-python-client Future to an asyncio future."""
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+
+    def on_done(done_future):
+        try:
+            result = done_future.result()
+        except Exception as e:
+            loop.call_soon_threadsafe(_set_exception, future, e)
+        else:
+            loop.call_soon_threadsafe(_set_result, future, result)
+
+    hazelcast_future.add_done_callback(on_done)
+    return future
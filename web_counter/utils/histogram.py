@@ -0,0 +1,91 @@
+import math
+import pathlib
+
+from utils.shared_memory import SharedInt, map_ints
+
+
+# 2^7 linear sub-buckets per power of two, ~1% relative error
+SUB_BUCKET_BITS = 7
+SUB_BUCKET_COUNT = 1 << SUB_BUCKET_BITS
+SUB_BUCKET_HALF = SUB_BUCKET_COUNT // 2
+# values above 2^36 us (~19 hours) are clamped into the last bucket
+MAX_SHIFT = 30
+BUCKET_COUNT = SUB_BUCKET_COUNT + MAX_SHIFT * SUB_BUCKET_HALF
+
+
+class LatencyHistogram:
+    """Fixed-size log-linear (HDR-style) histogram of integer values.
+
+    Values below SUB_BUCKET_COUNT are stored exactly, larger values are stored
+    with SUB_BUCKET_HALF buckets per power of two. Memory does not depend on
+    the number of recorded values.
+    """
+
+    def __init__(self):
+        self._counts = [0] * BUCKET_COUNT
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    @staticmethod
+    def _index(value: int) -> int:
+        if value < SUB_BUCKET_COUNT:
+            return max(value, 0)
+        shift = min(value.bit_length() - SUB_BUCKET_BITS, MAX_SHIFT)
+        top = min(value >> shift, SUB_BUCKET_COUNT - 1)
+        return SUB_BUCKET_COUNT + (shift - 1) * SUB_BUCKET_HALF + top - SUB_BUCKET_HALF
+
+    @staticmethod
+    def _upper_bound(index: int) -> int:
+        if index < SUB_BUCKET_COUNT:
+            return index
+        shift, offset = divmod(index - SUB_BUCKET_COUNT, SUB_BUCKET_HALF)
+        shift += 1
+        top = offset + SUB_BUCKET_HALF
+        return ((top + 1) << shift) - 1
+
+    def record(self, value: int) -> None:
+        self._counts[self._index(value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        for index, bucket_count in enumerate(other._counts):
+            self._counts[index] += bucket_count
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, percentile: float) -> int:
+        """Return the value at `percentile` (0-100), never above the recorded max."""
+        if self.count == 0:
+            return 0
+        target = max(math.ceil(percentile / 100 * self.count), 1)
+        seen = 0
+        for index, bucket_count in enumerate(self._counts):
+            seen += bucket_count
+            if seen >= target:
+                if index == len(self._counts) - 1:
+                    return self.max
+                return min(self._upper_bound(index), self.max)
+        return self.max
+
+
+class SharedLatencyHistogram(LatencyHistogram):
+    """LatencyHistogram kept in a memory-mapped file
+
+    Only one process should record into it, any process can map the same file
+    and read or merge it.
+    """
+
+    count = SharedInt(BUCKET_COUNT)
+    total = SharedInt(BUCKET_COUNT + 1)
+    max = SharedInt(BUCKET_COUNT + 2)
+
+    def __init__(self, path: pathlib.Path):
+        self._cells = map_ints(path, BUCKET_COUNT + 3)
+        self._counts = self._cells[:BUCKET_COUNT]
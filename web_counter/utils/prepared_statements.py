@@ -0,0 +1,37 @@
+import asyncio
+
+from cassandra.query import PreparedStatement
+from utils.futures import wrap_cassandra_future
+
+
+class PreparedStatementRegistry:
+    """Prepares each CQL statement once, without blocking the event loop.
+
+    Keyed by CQL text and consistency level. UNPREPARED answers are handled by
+    the driver, which prepares the statement again and retries.
+    """
+
+    def __init__(self, session):
+        self._session = session
+        self._statements: dict[tuple[str, int | None], PreparedStatement] = {}
+
+    async def prepare(
+        self, query: str, consistency_level: int | None = None
+    ) -> PreparedStatement:
+        key = (query, consistency_level)
+        statement = self._statements.get(key)
+        if statement is None:
+            # session.prepare is blocking, but runs only once per statement
+            statement = await asyncio.to_thread(self._session.prepare, query)
+            if consistency_level is not None:
+                statement.consistency_level = consistency_level
+            self._statements[key] = statement
+        return statement
+
+    async def execute(
+        self, query: str, parameters=(), consistency_level: int | None = None
+    ) -> list:
+        statement = await self.prepare(query, consistency_level)
+        return await wrap_cassandra_future(
+            self._session.execute_async(statement.bind(parameters))
+        )
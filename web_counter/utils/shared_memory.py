@@ -0,0 +1,76 @@
+"""Integer arrays in memory-mapped files, shared by the processes of one host.
+
+Each worker writes only to its own files and readers sum over all of them, so
+apart from SharedMemoryStorage nothing needs a cross-process lock.
+"""
+
+import mmap
+import os
+import pathlib
+import tempfile
+
+
+# set by serve.py when the API runs with several workers, and by the storage
+# benchmark for its processes mode
+SHARED_DIR_ENV = "WEB_COUNTER_SHARED_DIR"
+INT_SIZE = 8
+# tmpfs on Linux, so the shared files never touch the disk. Only used as the
+# parent of a mkdtemp directory, which is private to this run
+SHM_DIR = pathlib.Path("/dev/shm")  # ruff: ignore[hardcoded-temp-file]
+
+
+def shared_dir() -> pathlib.Path | None:
+    value = os.environ.get(SHARED_DIR_ENV)
+    return pathlib.Path(value) if value else None
+
+
+def create_shared_dir() -> pathlib.Path:
+    """New directory for the shared files of one run, the caller removes it"""
+    return pathlib.Path(
+        tempfile.mkdtemp(
+            prefix="web_counter-", dir=SHM_DIR if SHM_DIR.is_dir() else None
+        )
+    )
+
+
+def map_ints(path: pathlib.Path, length: int) -> memoryview:
+    """Map `length` int64 values stored in `path`, a new file starts zeroed"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    size = length * INT_SIZE
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        if os.fstat(fd).st_size < size:
+            os.ftruncate(fd, size)
+        mapping = mmap.mmap(fd, size)
+    finally:
+        # the mapping stays valid after the descriptor is closed
+        os.close(fd)
+    return memoryview(mapping).cast("q")
+
+
+class SharedInt:
+    """Attribute stored in cell `index` of the instance's `_cells`"""
+
+    def __init__(self, index: int):
+        self.index = index
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        return instance._cells[self.index]
+
+    def __set__(self, instance, value: int) -> None:
+        instance._cells[self.index] = value
+
+
+class SharedTimestamp(SharedInt):
+    """Unix time in seconds, kept as microseconds, 0 reads back as None"""
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        value = instance._cells[self.index]
+        return value / 1_000_000 if value else None
+
+    def __set__(self, instance, value: float | None) -> None:
+        instance._cells[self.index] = int(value * 1_000_000) if value else 0
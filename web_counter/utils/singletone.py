@@ -6,10 +6,12 @@ def singleton(cls):
     lock = Lock()
 
     def get_instance(*args, **kwargs):
-        if cls not in instances:
+        # one instance per configuration, e.g. sharded and unsharded storages
+        key = (args, tuple(sorted(kwargs.items())))
+        if key not in instances:
             with lock:
-                if cls not in instances:
-                    instances[cls] = cls(*args, **kwargs)
-        return instances[cls]
+                if key not in instances:
+                    instances[key] = cls(*args, **kwargs)
+        return instances[key]
 
     return get_instance